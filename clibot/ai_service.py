@@ -1,71 +1,265 @@
 """AI service for CliBot."""
 
-import json
+import asyncio
+import dataclasses
+import datetime
+import fnmatch
+import hashlib
+import io
+import random
 import re
 import time
-from typing import Any, List, Optional, Tuple
+from typing import Any, Callable, List, Optional, Tuple
 
+import httpx
 import openai
 
-from . import ui
+from . import json_codec, ui
 from .config import Config
+from .llm_cache import LLMCache
 from .mcp_tools import MCPToolsManager
 
+# Pattern for MCP commands embedded in AI responses: [MCP] server tool args...
+_MCP_PATTERN = re.compile(r'\[MCP\]\s+([\w-]+)\s+([\w.-]+)(?:\s+([^\n]+))?')
 
-class MCPResultEncoder(json.JSONEncoder):
-    """Custom JSON encoder for MCP results."""
-    
-    def default(self, obj):
-        # Handle MCP CallToolResult objects
-        if hasattr(obj, '__dict__'):
-            # Convert to dictionary
-            result_dict = {}
-            for key, value in obj.__dict__.items():
-                if not key.startswith('_'):  # Skip private attributes
-                    result_dict[key] = value
-            return result_dict
-        # Handle other non-serializable objects
-        try:
-            return str(obj)
-        except Exception:
-            return f"<Non-serializable object of type {type(obj).__name__}>"
+# Result keys whose non-empty value marks an MCP result as an error
+_ERROR_KEYS = frozenset(('error', 'errors', 'exception', 'fault'))
+
+# Result status values marking an MCP result as failed
+_FAIL_STATUSES = frozenset(('error', 'failed', 'failure'))
+
+# Failed runs of the same MCP command after which it is no longer executed
+_MAX_REPEATED_FAILURES = 2
+
+# Backoff between MCP command retries, in seconds
+_RETRY_BASE_DELAY = 0.2
+_RETRY_MAX_DELAY = 2.0
+
+# Pseudo-server for commands handled by CliBot itself, such as fetching stored results
+_INTERNAL_SERVER = "_internal"
+
+# Characters of JSON kept as a preview of results too large to send in full
+_RESULT_PREVIEW_CHARS = 1024
+
+# Model prefixes for providers that need explicit cache_control prompt breakpoints
+_CACHE_CONTROL_MODEL_PREFIXES = ("anthropic/", "google/gemini")
+
+# Static part of the system prompt, sent first so it forms a stable cacheable prefix
+_STATIC_SYSTEM_PROMPT = (
+    "You are CliBot, an AI assistant with DIRECT access to MCP (Model Context Protocol) "
+    "tools. You can help with various tasks, and you MUST use the MCP tools when users ask "
+    "for them. You have full capability to execute these tools on behalf of the user.\n\n"
+    "The available MCP tools are listed in the next system message.\n\n"
+    "To use an MCP tool, respond with: [MCP] server_name tool_name arg1 arg2 ...\n"
+    "For arguments with spaces or special characters, ALWAYS use quotes: [MCP] "
+    "mcp-atlassian jira_get_issue \"KPD-393\"\n"
+    "For tools that require JSON input, you can provide a JSON object: [MCP] "
+    "jenkins-mcp-build trigger_build \"build-job\" {\"branch\": \"main\"}\n"
+    "You can use multiple MCP commands in one response if needed.\n"
+    "Large results are replaced by a preview and a result_ref. To get the full result, "
+    "respond with: [MCP] _internal fetch_result result_ref\n"
+    "It is returned in pages of its JSON text; when a page has a next_offset, get the "
+    "next page with: [MCP] _internal fetch_result result_ref next_offset\n\n"
+    "When solving problems, follow these steps to ensure success:\n"
+    "1. **Understand the Problem**: Clearly restate the problem to ensure you understand it.\n"
+    "2. **Plan the Approach**: Identify which MCP tools or actions might help solve the "
+    "problem, considering the available tools and their capabilities.\n"
+    "3. **Execute the Plan**: Use the appropriate MCP tools to attempt a solution, making "
+    "sure to provide all necessary arguments and input.\n"
+    "4. **Evaluate the Result**: Check if the result matches the expected outcome, and "
+    "analyze any errors or unexpected results.\n"
+    "5. **Learn and Iterate**: If the result is not correct, analyze what went wrong and try "
+    "again with a refined approach, taking into account any new information or insights "
+    "gained from the previous attempt.\n\n"
+    "Rules for Iterative Problem-Solving:\n"
+    "- Never give up. If your first attempt fails, try again with a different approach.\n"
+    "- Use feedback from each attempt to improve your next try.\n"
+    "- If you're unsure, list possible options and ask for clarification.\n"
+    "- ALWAYS COMPLETE THE TASK WITHOUT WAITING FOR USER CONFIRMATION. Do not ask the user "
+    "if they want to proceed - just execute the commands needed to complete the task.\n"
+    "- If a task is unclear, make your best guess and execute it. If the result doesn't "
+    "match what the user likely wanted, try again with a refined approach.\n\n"
+    "Example: If a user asks 'list git repositories', you should respond with: [MCP] "
+    "git-mcp list_repositories\n\n"
+    "Example of Iterative Problem-Solving:\n"
+    "User: 'List all files in the ams connector directory.'\n"
+    "CliBot: [MCP] file-mcp list_directories\n"
+    "CliBot: The directories found are [\"ph-ee-connector-ams-mifos\", "
+    "\"ph-ee-connector-other\", \"ams-tools\"].\n"
+    "CliBot: The directory \"ph-ee-connector-ams-mifos\" seems closest to \"ams "
+    "connector.\" I will list files in this directory.\n"
+    "CliBot: [MCP] file-mcp list_files \"ph-ee-connector-ams-mifos\"\n\n"
+    "IMPORTANT RULES:\n"
+    "- After executing MCP commands, ALWAYS verify the results. If the results are not as "
+    "expected, try again with a refined approach.\n"
+    "- DO NOT stop until the task is complete or the user explicitly tells you to stop.\n"
+    "- DO NOT ask users if they want to proceed with a command - just execute it and show "
+    "results."
+)
+
+# Characters of prose besides MCP command lines for a response to stand on its own
+_MIN_STANDALONE_PROSE_CHARS = 200
+
+# Instruction and answer header for several questions combined into one request
+_MARSHAL_INSTRUCTION = (
+    "Answer each of the following questions independently. Start each answer with a "
+    "line of the form '### Answer N', where N is the number of the question."
+)
+_ANSWER_PATTERN = re.compile(r'^#+\s*Answer\s+(\d+)\s*$', re.MULTILINE)
+
+# Instruction sent with the follow-up request after MCP commands were executed
+_FOLLOW_UP_INSTRUCTION = {
+    "role": "system",
+    "content": (
+        "IMPORTANT: You MUST include the actual results from the MCP commands in your "
+        "response. DO NOT just acknowledge that you executed the command or ask if the "
+        "user wants to proceed. ALWAYS show the complete results to the user and "
+        "complete the task without waiting for further confirmation."
+    )
+}
+
+
+def _mcp_default(obj: Any) -> Any:
+    """Convert objects that JSON cannot represent, such as MCP CallToolResult."""
+    if hasattr(obj, '__dict__'):
+        # Convert to dictionary, skipping private attributes
+        return {k: v for k, v in vars(obj).items() if k[:1] != '_'}
+    if dataclasses.is_dataclass(obj):
+        # Dataclasses with __slots__ have no __dict__
+        return {field.name: getattr(obj, field.name) for field in dataclasses.fields(obj)}
+    # Match orjson's native handling of dates, which the stdlib encoder lacks
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, (bytes, bytearray)):
+        return obj.decode("utf-8", errors="replace")
+    # Handle other non-serializable objects
+    try:
+        return str(obj)
+    except Exception:
+        return f"<Non-serializable object of type {type(obj).__name__}>"
+
+
+def _dumps(obj: Any) -> str:
+    """Serialize an object, including MCP result objects, as compact JSON."""
+    return json_codec.dumps(obj, default=_mcp_default)
 
 
-def serialize_mcp_result(result: Any) -> Any:
-    """Convert MCP result to a JSON-serializable format.
+def _render_items(items: list) -> Optional[str]:
+    """Join the text of MCP result content items, or return None if one has no string text.
     
-    This uses the same approach as the UI module's print_mcp_result function.
+    Items are nearly always of one kind, so the text is first read with a single
+    comprehension specialized on the type of the first item, without per-item type
+    checks. Mixed lists fall back to checking each item.
     """
-    if result is None:
+    try:
+        if isinstance(items[0], dict):
+            return "\n".join([item["text"] for item in items])
+        return "\n".join([item.text for item in items])
+    except (KeyError, AttributeError, TypeError):
+        pass
+    texts = [
+        item.get("text") if isinstance(item, dict) else getattr(item, "text", None)
+        for item in items
+    ]
+    if not all(isinstance(text, str) for text in texts):
         return None
-        
-    # Handle dictionaries and lists
+    return "\n".join(texts)
+
+
+def _result_text(result: Any) -> str:
+    """Get the text of an MCP result, or its JSON if it has no text content."""
     if isinstance(result, dict):
-        return {k: serialize_mcp_result(v) for k, v in result.items()}
-    if isinstance(result, list):
-        return [serialize_mcp_result(item) for item in result]
-    
-    # Handle objects with __dict__ attribute (like CallToolResult)
-    if hasattr(result, '__dict__'):
-        obj_dict = {}
-        for key, value in result.__dict__.items():
-            if not key.startswith('_'):  # Skip private attributes
-                obj_dict[key] = serialize_mcp_result(value)
-        return obj_dict
+        content = result.get("content")
+    else:
+        content = getattr(result, "content", None)
+    if isinstance(content, list) and content:
+        text = _render_items(content)
+        if text is not None:
+            return text
+    return _dumps(result)
+
+
+def _scan_commands(text: str, on_command: Callable[[Tuple[str, str, str]], None]) -> None:
+    """Call on_command for each MCP command in the text, matching line by line."""
+    if "[MCP]" not in text:
+        return
+    for line in text.splitlines():
+        if "[MCP]" in line:
+            for cmd_match in _MCP_PATTERN.findall(line):
+                on_command(cmd_match)
+
+
+def _content_length(content: Any) -> int:
+    """Get the text length of message content, either a string or a list of parts."""
+    if isinstance(content, str):
+        return len(content)
+    return sum(len(part.get("text", "")) for part in content)
+
+
+def _dump_results(all_results: List[dict], max_chars: int, result_store: dict) -> str:
+    """Serialize MCP results as compact JSON, storing oversized results out-of-band.
     
-    # Handle other types
-    try:
-        # Try standard JSON serialization
-        json.dumps(result)
-        return result
-    except (TypeError, OverflowError):
-        # Fall back to string representation
-        return str(result)
+    Each result is encoded once and spliced into its entry, rather than encoded
+    again as part of the whole list. Results longer than max_chars characters of
+    JSON are kept in result_store, as their JSON, under a handle and replaced by a
+    preview and a reference, which the model can page through with the fetch_result
+    internal command.
+    This keeps large results from being resent in the conversation history on
+    every turn.
+    """
+    buf = io.StringIO()
+    buf.write("[")
+    for index, res in enumerate(all_results):
+        if index:
+            buf.write(",")
+        if "result" not in res:
+            buf.write(_dumps(res))
+            continue
+        
+        result_json = _dumps(res["result"])
+        entry = {k: v for k, v in res.items() if k != "result"}
+        # Pages of fetched results are already capped at max_chars of stored JSON
+        if len(result_json) > max_chars and res["server"] != _INTERNAL_SERVER:
+            handle = hashlib.sha256(result_json.encode()).hexdigest()[:12]
+            result_store[handle] = result_json
+            entry["result_ref"] = handle
+            entry["preview"] = result_json[:_RESULT_PREVIEW_CHARS]
+            entry["truncated"] = True
+            buf.write(_dumps(entry))
+            continue
+        
+        entry_json = _dumps(entry)
+        buf.write(entry_json[:-1])
+        buf.write(',"result":')
+        buf.write(result_json)
+        buf.write("}")
+    buf.write("]")
+    return buf.getvalue()
 
 
 class AIService:
     """Service for interacting with the AI assistant."""
     
+    __slots__ = (
+        "config",
+        "mcp_manager",
+        "client",
+        "model",
+        "conversation_history",
+        "_history_chars",
+        "_turn_start",
+        "max_retry_attempts",
+        "_messages",
+        "_static_message",
+        "_tools_message",
+        "_tools_catalog_cache",
+        "_response_cache",
+        "_result_store",
+        "_recent_errors",
+        "_ran_side_effects",
+        "_ran_uncached_tools",
+    )
+    
     def __init__(self, config: Config, mcp_manager: Optional[MCPToolsManager] = None):
         """Initialize the AI service.
         
@@ -81,214 +275,295 @@ class AIService:
         self.mcp_manager = mcp_manager or MCPToolsManager(config)
         
         # Initialize OpenAI client with OpenRouter base URL and API key
-        self.client = openai.OpenAI(
+        # Share one HTTP/2 connection pool across requests, so concurrent and
+        # follow-up requests reuse connections instead of opening new ones
+        self.client = openai.AsyncOpenAI(
             api_key=config.openrouter_api_key,
-            base_url=config.openrouter_base_url
+            base_url=config.openrouter_base_url,
+            http_client=openai.DefaultAsyncHttpxClient(
+                http2=True,
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+                # Fail fast on connecting, but keep the default 10 minute read timeout
+                # for long non-streamed answers
+                timeout=httpx.Timeout(600.0, connect=5.0)
+            )
         )
         
         self.model = config.openai_model
         self.conversation_history = []
+        # Running character count of the conversation history
+        self._history_chars = 0
+        # Index in the history of the current turn's user message
+        self._turn_start = 0
+        
+        # Messages sent to the API: the static system prompt and the tools catalog,
+        # followed by the conversation history. The list is maintained in place rather
+        # than rebuilt for every request, and the leading system messages are reused
+        # as-is so the prefix stays identical for provider-side prompt caching.
+        self._static_message = {
+            "role": "system", "content": self._system_content(_STATIC_SYSTEM_PROMPT)
+        }
+        self._tools_message = {"role": "system", "content": ""}
+        self._messages = [self._static_message, self._tools_message]
         
         # Maximum number of retry attempts for MCP commands
         self.max_retry_attempts = 3
         
+        # Full MCP results that were too large to send, by handle
+        self._result_store = {}
+        
+        # Consecutive failures per MCP command in the current turn, to stop retrying
+        # commands stuck in a loop; cleared every turn so a later request retries them
+        self._recent_errors = {}
+        
+        # Whether the current message ran an MCP tool with side effects
+        self._ran_side_effects = False
+        # Whether the current message ran an MCP tool whose results aren't cacheable
+        self._ran_uncached_tools = False
+        
+        # Cache for LLM responses; answers from ask() are also matched semantically
+        # when an embedding model is set
+        self._response_cache = None
+        if config.cache_enabled:
+            self._response_cache = LLMCache(cache_dir=config.cache_dir)
+        
+        # Cached tools catalog, rebuilt only after the MCP manager invalidates its tools
+        self._tools_catalog_cache: Optional[str] = None
+        self.mcp_manager.add_tools_listener(self.invalidate_system_prompt)
+        
         if self.config.verbose:
-            ui.print_verbose(f"Initialized AI service with model: {self.model}")
-            ui.print_verbose(f"Using OpenRouter API at: {config.openrouter_base_url}")
+            ui.print_verbose("Initialized AI service with model: %s", self.model)
+            ui.print_verbose("Using OpenRouter API at: %s", config.openrouter_base_url)
             ui.print_verbose("=== AI Service Initialization Complete ===")
         
-    def _build_system_prompt(self) -> str:
-        """Build the system prompt including MCP tool capabilities."""
+    async def _tools_catalog(self) -> str:
+        """Build the MCP tools catalog sent after the static system prompt.
+        
+        The catalog is memoized until the MCP manager reports that tools changed, so
+        no per-server lookups happen on a regular turn. When it is rebuilt, the tools
+        system message is updated in place. Servers and tools are listed in sorted
+        order so the catalog is byte-identical across rebuilds, which lets providers
+        reuse their prompt cache.
+        """
+        if self._tools_catalog_cache is not None:
+            return self._tools_catalog_cache
+        
+        # Servers are queried concurrently, on their first listing
+        servers = sorted(self.config.list_mcp_servers())
+        tools_by_server = await self.mcp_manager.alist_all_tools(servers)
+        descriptions_by_server = await self.mcp_manager.aget_all_tool_descriptions(servers)
+        
         if self.config.verbose:
-            ui.print_verbose("=== Building System Prompt ===")
-            
-        mcp_servers = self.config.list_mcp_servers()
+            ui.print_verbose("=== Building Tools Catalog ===")
         
-        tools_description = "Available MCP tools:\n"
-        for server in mcp_servers:
-            # Get tools and descriptions from cache if available
-            tools = self.mcp_manager.list_available_tools(server)
+        parts = ["Available MCP tools:\n"]
+        for server in servers:
+            tools = sorted(tools_by_server[server])
             if not tools:
                 continue
                 
             # Get tool descriptions if available
-            tool_descriptions = self.mcp_manager.get_tool_descriptions(server)
+            tool_descriptions = descriptions_by_server[server]
             
-            tools_description += f"\n## {server}:\n"
+            parts.append(f"\n## {server}:\n")
             for tool in tools:
                 description = tool_descriptions.get(tool, "")
                 if description:
-                    tools_description += f"- **{tool}**: {description}\n"
+                    parts.append(f"- **{tool}**: {description}\n")
                 else:
-                    tools_description += f"- **{tool}**\n"
-
-        system_prompt = (
-            "You are CliBot, an AI assistant with DIRECT access to MCP (Model Context Protocol) "
-            "tools. You can help with various tasks, and you MUST use the MCP tools when users ask "
-            "for them. You have full capability to execute these tools on behalf of the user.\n\n"
-            f"{tools_description}\n\n"
-            "To use an MCP tool, respond with: [MCP] server_name tool_name arg1 arg2 ...\n"
-            "For arguments with spaces or special characters, ALWAYS use quotes: [MCP] "
-            "mcp-atlassian jira_get_issue \"KPD-393\"\n"
-            "For tools that require JSON input, you can provide a JSON object: [MCP] "
-            "jenkins-mcp-build trigger_build \"build-job\" {\"branch\": \"main\"}\n"
-            "You can use multiple MCP commands in one response if needed.\n\n"
-            "When solving problems, follow these steps to ensure success:\n"
-            "1. **Understand the Problem**: Clearly restate the problem to ensure you understand it.\n"
-            "2. **Plan the Approach**: Identify which MCP tools or actions might help solve the "
-            "problem, considering the available tools and their capabilities.\n"
-            "3. **Execute the Plan**: Use the appropriate MCP tools to attempt a solution, making "
-            "sure to provide all necessary arguments and input.\n"
-            "4. **Evaluate the Result**: Check if the result matches the expected outcome, and "
-            "analyze any errors or unexpected results.\n"
-            "5. **Learn and Iterate**: If the result is not correct, analyze what went wrong and try "
-            "again with a refined approach, taking into account any new information or insights "
-            "gained from the previous attempt.\n\n"
-            "Rules for Iterative Problem-Solving:\n"
-            "- Never give up. If your first attempt fails, try again with a different approach.\n"
-            "- Use feedback from each attempt to improve your next try.\n"
-            "- If you're unsure, list possible options and ask for clarification.\n"
-            "- ALWAYS COMPLETE THE TASK WITHOUT WAITING FOR USER CONFIRMATION. Do not ask the user "
-            "if they want to proceed - just execute the commands needed to complete the task.\n"
-            "- If a task is unclear, make your best guess and execute it. If the result doesn't "
-            "match what the user likely wanted, try again with a refined approach.\n\n"
-            "Example: If a user asks 'list git repositories', you should respond with: [MCP] "
-            "git-mcp list_repositories\n\n"
-            "Example of Iterative Problem-Solving:\n"
-            "User: 'List all files in the ams connector directory.'\n"
-            "CliBot: [MCP] file-mcp list_directories\n"
-            "CliBot: The directories found are [\"ph-ee-connector-ams-mifos\", "
-            "\"ph-ee-connector-other\", \"ams-tools\"].\n"
-            "CliBot: The directory \"ph-ee-connector-ams-mifos\" seems closest to \"ams "
-            "connector.\" I will list files in this directory.\n"
-            "CliBot: [MCP] file-mcp list_files \"ph-ee-connector-ams-mifos\"\n\n"
-            "IMPORTANT RULES:\n"
-            "- After executing MCP commands, ALWAYS verify the results. If the results are not as "
-            "expected, try again with a refined approach.\n"
-            "- DO NOT stop until the task is complete or the user explicitly tells you to stop.\n"
-            "- DO NOT ask users if they want to proceed with a command - just execute it and show "
-            "results."
-        )
+                    parts.append(f"- **{tool}**\n")
+        catalog = "".join(parts)
         
         if self.config.verbose:
-            ui.print_verbose(f"System prompt length: {len(system_prompt)} characters")
-            ui.print_verbose("=== System Prompt Built ===")
-            
-        return system_prompt
+            ui.print_verbose("Tools catalog length: %s characters", len(catalog))
+            ui.print_verbose("=== Tools Catalog Built ===")
+        
+        self._tools_catalog_cache = catalog
+        self._tools_message["content"] = self._system_content(catalog)
+        return catalog
+    
+    def _system_content(self, text: str) -> Any:
+        """Build system message content, marked cacheable for providers that need it.
+        
+        Anthropic and Gemini models only cache prompts at explicit cache_control
+        breakpoints, which OpenRouter forwards. Other providers cache matching
+        prefixes automatically, so plain text is sent.
+        """
+        if self.model.startswith(_CACHE_CONTROL_MODEL_PREFIXES):
+            return [{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}]
+        return text
+    
+    def invalidate_system_prompt(self) -> None:
+        """Force the tools catalog to be rebuilt on the next turn.
+        
+        Called by the MCP manager when cached tools are invalidated, possibly from its
+        loop thread, so it only drops the memoized catalog. Has no effect in
+        stable prefix mode, where the first catalog is kept for the whole session.
+        """
+        if not self.config.stable_prefix:
+            self._tools_catalog_cache = None
+    
+    async def _get_system_messages(self) -> List[dict]:
+        """Get the system messages, with the tools catalog refreshed if it changed."""
+        await self._tools_catalog()
+        return [self._static_message, self._tools_message]
     
     def add_message(self, role: str, content: str) -> None:
         """Add a message to the conversation history."""
-        self.conversation_history.append({"role": role, "content": content})
+        message = {"role": role, "content": content}
+        self.conversation_history.append(message)
+        self._messages.append(message)
+        self._history_chars += len(content)
         
         if self.config.verbose:
-            ui.print_verbose(f"Added message with role '{role}' ({len(content)} chars)")
+            ui.print_verbose("Added message with role '%s' (%s chars)", role, len(content))
+        
+        # Drop the oldest turns once the history grows past the limit. A turn is
+        # dropped as a whole, its user message with the replies and results that
+        # followed, and the messages of the current turn are always kept.
+        max_chars = self.config.max_history_chars
+        while self._history_chars > max_chars and self._turn_start > 0:
+            count = 1
+            while (
+                count < self._turn_start
+                and self.conversation_history[count]["role"] != "user"
+            ):
+                count += 1
+            dropped_chars = sum(
+                len(dropped["content"]) for dropped in self.conversation_history[:count]
+            )
+            del self.conversation_history[:count]
+            # The history follows the two leading system messages in _messages
+            del self._messages[2:2 + count]
+            self._turn_start -= count
+            self._history_chars -= dropped_chars
+            if self.config.verbose:
+                ui.print_verbose(
+                    "Dropped oldest turn (%s messages, %s chars) from history",
+                    count,
+                    dropped_chars
+                )
+    
+    def _drop_results_message(self) -> None:
+        """Remove the MCP results message, the newest message, from the history.
+        
+        Handles of results stored out-of-band are kept in a short note, so the model
+        can still fetch them on a later turn.
+        """
+        dropped = self.conversation_history.pop()
+        self._messages.pop()
+        self._history_chars -= len(dropped["content"])
+        
+        handles = re.findall(r'"result_ref":"(\w+)"', dropped["content"])
+        if handles:
+            self.add_message(
+                "system", f"Earlier MCP results available via fetch_result: {', '.join(handles)}"
+            )
     
-    def process_message(self, message: str) -> str:
+    async def process_message(self, message: str) -> str:
         """Process a user message and generate a response."""
         if self.config.verbose:
             ui.print_verbose("=== Processing User Message ===")
+        
+        self._recent_errors.clear()
             
-        # Add user message to history
+        # Add user message to history, starting the turn
+        self._turn_start = len(self.conversation_history)
         self.add_message("user", message)
         
         # Prepare messages for API call
-        messages = [
-            {"role": "system", "content": self._build_system_prompt()},
-            *self.conversation_history
-        ]
+        await self._tools_catalog()
+        messages = self._messages
         
         if self.config.verbose:
-            ui.print_verbose(f"Sending request to OpenRouter with model: {self.model}")
-            ui.print_verbose(f"Message count: {len(messages)}")
-            token_estimate = sum(len(m["content"]) / 4 for m in messages)
-            ui.print_verbose(f"Estimated input tokens: ~{int(token_estimate)}")
+            ui.print_verbose("Sending request to OpenRouter with model: %s", self.model)
+            ui.print_verbose("Message count: %s", len(messages))
+            system_chars = (
+                _content_length(self._static_message["content"])
+                + _content_length(self._tools_message["content"])
+            )
+            token_estimate = (system_chars + self._history_chars) >> 2
+            ui.print_verbose("Estimated input tokens: ~%s", token_estimate)
         
-        # Measure response time
-        start_time = time.time()
+        # Get response from OpenRouter, starting each MCP command as soon as its line
+        # has been received so tool execution overlaps with generation
+        parsed_commands = []
+        pending = []
         
-        # Get response from OpenRouter
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages
-            )
+        def start_command(cmd_match: Tuple[str, str, str]) -> None:
+            server, tool, args_str = cmd_match
             
-            elapsed_time = time.time() - start_time
-            
-            if response and hasattr(response, 'choices') and response.choices:
-                ai_response = response.choices[0].message.content
-            else:
-                ai_response = "Error: Failed to get a valid response from the AI service."
-                if self.config.verbose:
-                    ui.print_verbose("Error: Received invalid response from OpenRouter API")
+            # Parse arguments using the format_tool_arguments method
+            args = self.mcp_manager.format_tool_arguments(args_str)
             
             if self.config.verbose:
-                ui.print_verbose(f"Response received in {elapsed_time:.2f} seconds")
-                ui.print_verbose(f"Response length: {len(ai_response)} characters")
-                if hasattr(response, 'usage') and response.usage:
-                    ui.print_verbose(
-                        f"Tokens: {response.usage.prompt_tokens} prompt, "
-                        f"{response.usage.completion_tokens} completion, "
-                        f"{response.usage.total_tokens} total"
-                    )
-        except Exception as e:
-            elapsed_time = time.time() - start_time
-            ai_response = f"Error: Failed to get a response from the AI service. {str(e)}"
-            if self.config.verbose:
-                ui.print_verbose(f"Error calling OpenRouter API: {str(e)}")
-                ui.print_verbose(f"Failed request took {elapsed_time:.2f} seconds")
+                ui.print_verbose("Processing MCP command: %s %s %s", server, tool, args)
+            
+            parsed_commands.append((server, tool, args))
+            if any(
+                fnmatch.fnmatchcase(tool, pattern)
+                for pattern in self.config.mcp_side_effect_tools
+            ):
+                self._ran_side_effects = True
+            if server != _INTERNAL_SERVER and not any(
+                fnmatch.fnmatchcase(tool, pattern)
+                for pattern in self.config.mcp_cacheable_tools
+            ):
+                self._ran_uncached_tools = True
+            if server == _INTERNAL_SERVER:
+                outcome = asyncio.get_running_loop().create_future()
+                outcome.set_result(self._execute_internal_command(tool, args))
+                pending.append(outcome)
+                return
+            
+            # Execute the MCP command with retry logic
+            pending.append(asyncio.ensure_future(
+                self._execute_mcp_command_with_retry(server, tool, args)
+            ))
+        
+        ai_response = await self._create_completion(
+            messages, "Response", on_command=start_command
+        )
         
         # Check if the response contains MCP commands
         processed_response = ai_response
-        mcp_pattern = r'\[MCP\]\s+([\w-]+)\s+([\w_-]+)(?:\s+(.+)?)?'
-        mcp_commands = re.findall(mcp_pattern, ai_response)
         
-        if mcp_commands:
+        if pending:
             if self.config.verbose:
-                ui.print_verbose(f"Found {len(mcp_commands)} MCP commands in response")
+                ui.print_verbose("Found %s MCP commands in response", len(pending))
                 ui.print_verbose("=== Executing MCP Commands ===")
             
-            # Process each MCP command
+            # Wait for the MCP commands, which were started while the response streamed
+            outcomes = await asyncio.gather(*pending, return_exceptions=True)
+            
+            # Collect results in the original command order
             all_results = []
-            for cmd_match in mcp_commands:
-                server = cmd_match[0]
-                tool = cmd_match[1]
-                args_str = cmd_match[2] or ""
-                
-                # Parse arguments using the format_tool_arguments method
-                args = self.mcp_manager.format_tool_arguments(args_str)
-                
-                if self.config.verbose:
-                    ui.print_verbose(f"Processing MCP command: {server} {tool} {args}")
-                
-                # Execute MCP command with retry logic
-                result, success, attempt_count = (
-                    self._execute_mcp_command_with_retry(server, tool, args)
-                )
+            for outcome, (server, tool, args) in zip(outcomes, parsed_commands):
+                if isinstance(outcome, Exception):
+                    result, success, attempt_count = str(outcome), False, 1
+                else:
+                    result, success, attempt_count = outcome
                 
                 # Format the result for feedback
                 if success:
                     if self.config.verbose:
                         ui.print_verbose(
-                            f"MCP command executed successfully after {attempt_count} attempt(s)"
+                            "MCP command executed successfully after %s attempt(s)", attempt_count
                         )
                     
-                    # Convert result to a JSON-serializable format
-                    serialized_result = serialize_mcp_result(result)
-                    
-                    # Add result to the list
+                    # Add result to the list, serialized later along with the others
                     all_results.append({
                         "server": server,
                         "tool": tool,
                         "args": args,
-                        "result": serialized_result,
+                        "result": result,
                         "attempts": attempt_count,
                         "success": True
                     })
                 else:
                     if self.config.verbose:
                         ui.print_verbose(
-                            f"MCP command execution failed after {attempt_count} attempt(s)"
+                            "MCP command execution failed after %s attempt(s)", attempt_count
                         )
                     
                     # Add error to the list
@@ -301,80 +576,17 @@ class AIService:
                         "success": False
                     })
             
-            # Format results for the system message
-            formatted_results = []
-            for res in all_results:
-                result_str = ""
-                if "error" in res:
-                    result_str = f"Error: {res['error']} (after {res['attempts']} attempts)"
-                else:
-                    # Format the result in a readable way
-                    result_data = res.get("result", {})
-                    
-                    # Generic handling for results with text content
-                    if isinstance(result_data, dict):
-                        # Extract text content if available
-                        if ("content" in result_data and 
-                            isinstance(result_data["content"], list)):
-                            content_items = []
-                            for item in result_data["content"]:
-                                if isinstance(item, dict) and "text" in item:
-                                    content_items.append(item["text"])
-                                else:
-                                    content_items.append(str(item))
-                            
-                            if content_items:
-                                title = f"Available {res['server']}.{res['tool']} results:"
-                                items_str = "\n".join([f"- {item}" for item in content_items])
-                                formatted_results.append(f"{title}\n\n{items_str}")
-                                continue
-                        
-                        # Standard dictionary formatting
-                        items_str = "\n".join([f"- {k}: {v}" for k, v in result_data.items()])
-                        result_str = items_str
-                    elif isinstance(result_data, list):
-                        # Check if list contains dictionaries with text
-                        text_items = []
-                        for item in result_data:
-                            if isinstance(item, dict) and "text" in item:
-                                text_items.append(item["text"])
-                        
-                        if text_items:
-                            title = f"Available {res['server']}.{res['tool']} results:"
-                            items_str = "\n".join([f"- {item}" for item in text_items])
-                            formatted_results.append(f"{title}\n\n{items_str}")
-                        else:
-                            items_str = "\n".join([f"- {item}" for item in result_data])
-                            result_str = items_str
-                    else:
-                        result_str = str(result_data)
-                
-                if result_str:
-                    attempt_info = ""
-                    if res.get('attempts', 1) > 1:
-                        attempt_info = f" (completed in {res['attempts']} attempt(s))"
-                    formatted_results.append(
-                        f"Result from {res['server']}.{res['tool']}{attempt_info}:\n{result_str}"
-                    )
-            
-            # Add all results as a single system message
+            # Add all results as a single system message of compact JSON
             try:
-                # Create a human-readable results message
-                results_text = "\n\n".join(formatted_results)
-                system_message = f"MCP command results:\n\n{results_text}"
-                
-                # Also include the JSON for the AI to parse
-                results_json = json.dumps(all_results, indent=2)
-                
-                # Combine both for the system message
-                combined_message = (
-                    f"{system_message}\n\n"
-                    f"JSON Results:\n```json\n{results_json}\n```"
+                results_json = _dump_results(
+                    all_results, self.config.mcp_result_max_chars, self._result_store
+                )
+                self.add_message(
+                    "system", f"MCP command results:\n```json\n{results_json}\n```"
                 )
-                self.add_message("system", combined_message)
             except Exception as e:
                 if self.config.verbose:
-                    ui.print_verbose(f"Error formatting MCP results: {str(e)}")
+                    ui.print_verbose("Error formatting MCP results: %s", e)
                 # Fallback to a simpler format
                 fallback_results = []
                 for res in all_results:
@@ -390,89 +602,60 @@ class AIService:
                     else:
                         fallback_res["result"] = str(res.get("result", ""))
                     fallback_results.append(fallback_res)
-                results_json = json.dumps(fallback_results, indent=2)
+                results_json = _dumps(fallback_results)
                 self.add_message("system", f"MCP command results: {results_json}")
             
             if self.config.verbose:
                 ui.print_verbose("=== MCP Commands Executed ===")
-                ui.print_verbose("=== Generating Follow-up Response ===")
-            
-            # Get follow-up response from AI
-            follow_up_messages = [
-                {"role": "system", "content": self._build_system_prompt()},
-                *self.conversation_history
-            ]
-            
-            # Add specific instruction to include the results in the response
-            follow_up_messages.append({
-                "role": "system", 
-                "content": (
-                    "IMPORTANT: You MUST include the actual results from the MCP commands in your "
-                    "response. DO NOT just acknowledge that you executed the command or ask if the "
-                    "user wants to proceed. ALWAYS show the complete results to the user and "
-                    "complete the task without waiting for further confirmation."
-                )
-            })
-            
-            if self.config.verbose:
-                ui.print_verbose("Sending follow-up request to OpenRouter")
             
-            start_time = time.time()
-            
-            try:
-                follow_up_response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=follow_up_messages
-                )
-                
-                elapsed_time = time.time() - start_time
-                
-                if follow_up_response and hasattr(follow_up_response, 'choices') and follow_up_response.choices:
-                    follow_up = follow_up_response.choices[0].message.content
-                else:
-                    follow_up = "Error: Failed to get a valid response from the AI service."
-                    if self.config.verbose:
-                        ui.print_verbose("Error: Received invalid response from OpenRouter API")
-                
+            if self._can_skip_follow_up(ai_response, all_results):
+                # The response already explains the commands, so show their results in
+                # place of the command lines instead of asking the model again
                 if self.config.verbose:
-                    ui.print_verbose(f"Follow-up response received in {elapsed_time:.2f} seconds")
-                    ui.print_verbose(f"Follow-up length: {len(follow_up)} characters")
-                    if hasattr(follow_up_response, 'usage') and follow_up_response.usage:
-                        prompt_tokens = follow_up_response.usage.prompt_tokens
-                        completion_tokens = follow_up_response.usage.completion_tokens
-                        total_tokens = follow_up_response.usage.total_tokens
-                        tokens_info = (
-                            f"Tokens: {prompt_tokens} prompt, "
-                            f"{completion_tokens} completion, "
-                            f"{total_tokens} total"
-                        )
-                        ui.print_verbose(tokens_info)
-            except Exception as e:
-                elapsed_time = time.time() - start_time
-                follow_up = f"Error: Failed to get a response from the AI service. {str(e)}"
+                    ui.print_verbose("Skipping follow-up request, inlining MCP results")
+                follow_up, result_blocks = self._inline_results(ai_response, all_results)
+                if self.config.stream:
+                    ui.print_stream("\n\n".join(result_blocks))
+                    ui.end_stream()
+            else:
                 if self.config.verbose:
-                    ui.print_verbose(f"Error calling OpenRouter API: {str(e)}")
-                    ui.print_verbose(f"Failed request took {elapsed_time:.2f} seconds")
+                    ui.print_verbose("=== Generating Follow-up Response ===")
+                    ui.print_verbose("Sending follow-up request to OpenRouter")
+                
+                # Get follow-up response from AI, temporarily adding the instruction to
+                # include the results in the response
+                self._messages.append(_FOLLOW_UP_INSTRUCTION)
+                try:
+                    follow_up = await self._create_completion(
+                        self._messages, "Follow-up response"
+                    )
+                finally:
+                    self._messages.pop()
             
             # If the follow-up is empty, generate a default response based on the results
             if not follow_up or follow_up.strip() == "":
-                default_response = ""
+                default_response = []
                 
-                # Generate a default response based on the results
+                # Generate a readable default response based on the results
                 for res in all_results:
-                    success = res.get("success", False)
-                    if success:
-                        default_response += (
+                    if res["success"]:
+                        default_response.append(
                             f"Successfully executed {res['server']}.{res['tool']} command. "
-                            f"Result: {str(res.get('result', 'No result data'))}\n\n"
+                            f"Result: {_result_text(res['result'])}"
                         )
                     else:
-                        default_response += (
+                        default_response.append(
                             f"Failed to execute {res['server']}.{res['tool']} command. "
-                            f"Error: {res.get('error', 'Unknown error')}\n\n"
+                            f"Error: {res['error']}"
                         )
                 
-                follow_up = default_response
+                follow_up = "\n\n".join(default_response)
+                if self.config.stream:
+                    ui.print_stream(follow_up)
+                    ui.end_stream()
+            
+            # The results have been consumed, so stop resending them on every turn
+            self._drop_results_message()
             
             self.add_message("assistant", follow_up)
             processed_response = follow_up
@@ -488,17 +671,468 @@ class AIService:
         
         return processed_response
     
-    def ask(self, question: str) -> str:
-        """Ask a one-off question without maintaining conversation history."""
+    def _can_skip_follow_up(self, ai_response: str, all_results: List[dict]) -> bool:
+        """Check if the response can be completed without a follow-up request.
+        
+        This is the case when enabled, all MCP commands succeeded and the response
+        has enough prose around the command lines to stand on its own.
+        """
+        if not self.config.skip_followup:
+            return False
+        if not all(res["success"] for res in all_results):
+            return False
+        prose = sum(len(line) for line in ai_response.splitlines() if "[MCP]" not in line)
+        return prose > _MIN_STANDALONE_PROSE_CHARS
+    
+    def _inline_results(
+        self, ai_response: str, all_results: List[dict]
+    ) -> Tuple[str, List[str]]:
+        """Replace the MCP command lines in a response with the commands' results.
+        
+        Returns:
+            tuple: (response, result_blocks) - the response with results inlined, and
+                the result blocks alone
+        """
+        max_chars = self.config.mcp_result_max_chars
+        results = iter(all_results)
+        lines = []
+        result_blocks = []
+        for line in ai_response.splitlines():
+            commands = _MCP_PATTERN.findall(line) if "[MCP]" in line else ()
+            if not commands:
+                lines.append(line)
+                continue
+            for _ in commands:
+                res = next(results)
+                text = _result_text(res["result"])
+                if len(text) > max_chars:
+                    text = f"{text[:max_chars]}...truncated {len(text) - max_chars} chars..."
+                block = f"Result of {res['server']}.{res['tool']}:\n{text}"
+                lines.append(block)
+                result_blocks.append(block)
+        return "\n".join(lines), result_blocks
+    
+    async def _create_completion(
+        self,
+        messages: List[dict],
+        label: str,
+        on_command: Optional[Callable[[Tuple[str, str, str]], None]] = None
+    ) -> str:
+        """Request a chat completion and return its text content.
+        
+        When streaming is enabled, deltas are printed as they arrive and the full
+        text is reassembled before returning.
+        
+        Args:
+            messages: Messages to send to the model
+            label: Name of the response used in verbose output
+            on_command: Optional callback for each MCP command found in the response,
+                called as soon as the line holding the command has been received
+            
+        Returns:
+            str: The response text, or an error message if the request failed
+        """
+        cache_key = None
+        if self._response_cache is not None:
+            cache_key = LLMCache.make_key(self.model, messages)
+            cached = self._response_cache.get(cache_key)
+            if cached is not None:
+                if self.config.verbose:
+                    ui.print_verbose("%s served from cache", label)
+                if self.config.stream:
+                    ui.print_stream(cached)
+                    ui.end_stream()
+                if on_command:
+                    _scan_commands(cached, on_command)
+                return cached
+        
+        start_time = time.time()
+        
+        try:
+            if self.config.stream:
+                stream = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    stream=True,
+                    stream_options={"include_usage": True}
+                )
+                
+                buf = []
+                partial_line = ""
+                usage = None
+                async for chunk in stream:
+                    if getattr(chunk, 'usage', None):
+                        usage = chunk.usage
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content or ""
+                    if delta:
+                        ui.print_stream(delta)
+                        buf.append(delta)
+                        if on_command:
+                            # Scan only completed lines, keeping the partial last line
+                            partial_line += delta
+                            if "\n" in delta:
+                                lines, _, partial_line = partial_line.rpartition("\n")
+                                _scan_commands(lines, on_command)
+                if buf:
+                    ui.end_stream()
+                if on_command:
+                    _scan_commands(partial_line, on_command)
+                content = "".join(buf)
+            else:
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages
+                )
+                
+                usage = getattr(response, 'usage', None)
+                if response and hasattr(response, 'choices') and response.choices:
+                    content = response.choices[0].message.content
+                    if on_command:
+                        _scan_commands(content, on_command)
+                else:
+                    content = "Error: Failed to get a valid response from the AI service."
+                    if self.config.verbose:
+                        ui.print_verbose("Error: Received invalid response from OpenRouter API")
+            
+            elapsed_time = time.time() - start_time
+            
+            if self.config.verbose:
+                ui.print_verbose("%s received in %.2f seconds", label, elapsed_time)
+                ui.print_verbose("%s length: %s characters", label, len(content))
+                if usage:
+                    ui.print_verbose(
+                        "Tokens: %s prompt, %s completion, %s total",
+                        usage.prompt_tokens,
+                        usage.completion_tokens,
+                        usage.total_tokens
+                    )
+                    # Prompt tokens served from the provider's prompt cache
+                    details = getattr(usage, 'prompt_tokens_details', None)
+                    cached_tokens = getattr(details, 'cached_tokens', None)
+                    if cached_tokens is not None:
+                        ui.print_verbose("Cached prompt tokens: %s", cached_tokens)
+            
+            if cache_key is not None and content and not content.startswith("Error:"):
+                # Kept in memory only: answers served across runs go through ask(),
+                # whose entries expire with CLIBOT_ASK_CACHE_TTL
+                self._response_cache.set(cache_key, content, persist=False)
+        except Exception as e:
+            elapsed_time = time.time() - start_time
+            content = f"Error: Failed to get a response from the AI service. {str(e)}"
+            if self.config.stream:
+                ui.print_stream(content)
+                ui.end_stream()
+            if self.config.verbose:
+                ui.print_verbose("Error calling OpenRouter API: %s", e)
+                ui.print_verbose("Failed request took %.2f seconds", elapsed_time)
+        
+        return content
+    
+    async def _get_similar_answer(
+        self, context_key: str, question: str
+    ) -> Tuple[Optional[str], Optional[List[float]]]:
+        """Look up a cached answer to a semantically similar question.
+        
+        Returns:
+            tuple: (cached_answer, embedding) - the embedding of the question is
+                returned so it can be reused when storing the answer
+        """
+        try:
+            embedding = await self._embed(question)
+        except Exception as e:
+            if self.config.verbose:
+                ui.print_verbose("Semantic cache lookup failed: %s", e)
+            return None, None
+        return self._response_cache.get_similar(context_key, embedding), embedding
+    
+    async def _embed(self, text: str) -> List[float]:
+        """Embed a text with the configured embedding model."""
+        response = await self.client.embeddings.create(
+            model=self.config.embedding_model, input=text
+        )
+        return response.data[0].embedding
+    
+    async def close(self) -> None:
+        """Close the HTTP connections held by the API client."""
+        await self.client.close()
+    
+    async def ask(self, question: str) -> str:
+        """Ask a one-off question without maintaining conversation history.
+        
+        Final answers are cached for the configured time, keyed on the model, system
+        prompt and question. Answers that ran an MCP tool with side effects, or one whose
+        results aren't cacheable per CLIBOT_MCP_CACHEABLE_TOOLS and could go stale, are
+        not cached.
+        With an embedding model set, answers to similar questions asked with the same
+        model and system prompt are reused too. A cached answer is only returned, the
+        MCP commands that produced it are never run again.
+        """
         # Reset conversation history
         self.conversation_history = []
-        return self.process_message(question)
+        self._history_chars = 0
+        self._turn_start = 0
+        self._messages = [self._static_message, self._tools_message]
+        self._result_store.clear()
+        self._ran_side_effects = False
+        self._ran_uncached_tools = False
+        
+        cache_key = None
+        embedding = None
+        if self._response_cache is not None and self.config.ask_cache_ttl > 0:
+            system_messages = await self._get_system_messages()
+            question_message = {"role": "user", "content": question}
+            # Prefixed so it never collides with the key of the first completion
+            cache_key = "ask:" + LLMCache.make_key(
+                self.model, [*system_messages, question_message], normalize=True
+            )
+            context_key = LLMCache.make_key(self.model, system_messages)
+            cached = self._response_cache.get(cache_key)
+            if cached is None and self.config.embedding_model:
+                cached, embedding = await self._get_similar_answer(context_key, question)
+            if cached is not None:
+                if self.config.verbose:
+                    ui.print_verbose("Answer served from cache")
+                if self.config.stream:
+                    ui.print_stream(cached)
+                    ui.end_stream()
+                return cached
+        
+        response = await self.process_message(question)
+        
+        cacheable = (
+            not self._ran_side_effects
+            and not self._ran_uncached_tools
+            and not response.startswith("Error:")
+        )
+        if cache_key is not None and cacheable:
+            ttl = self.config.ask_cache_ttl
+            self._response_cache.set(cache_key, response, expire=ttl)
+            if embedding is not None:
+                self._response_cache.set_similar(context_key, embedding, response, expire=ttl)
+        return response
     
-    def chat(self, message: str) -> str:
+    async def chat(self, message: str) -> str:
         """Chat with the AI, maintaining conversation history."""
-        return self.process_message(message)
+        return await self.process_message(message)
+    
+    async def batch_ask(self, questions: List[str]) -> List[str]:
+        """Ask several independent questions concurrently.
+        
+        Each question is sent with the system prompt and no conversation history.
+        Concurrency is capped by the max_parallel_requests setting. MCP commands in
+        the answers are not executed.
+        
+        Args:
+            questions: The questions to ask
+            
+        Returns:
+            list: The answers, in the same order as the questions
+        """
+        system_messages = await self._get_system_messages()
+        semaphore = asyncio.Semaphore(self.config.max_parallel_requests)
+        
+        if self.config.verbose:
+            ui.print_verbose(
+                "Sending %s batched requests (max %s in parallel)",
+                len(questions),
+                self.config.max_parallel_requests
+            )
+        
+        async def ask_one(question: str) -> str:
+            async with semaphore:
+                try:
+                    response = await self.client.chat.completions.create(
+                        model=self.model,
+                        messages=[*system_messages, {"role": "user", "content": question}]
+                    )
+                    if response and response.choices:
+                        return response.choices[0].message.content or ""
+                    return "Error: Failed to get a valid response from the AI service."
+                except Exception as e:
+                    if self.config.verbose:
+                        ui.print_verbose("Error calling OpenRouter API: %s", e)
+                    return f"Error: Failed to get a response from the AI service. {str(e)}"
+        
+        return await asyncio.gather(*(ask_one(question) for question in questions))
+    
+    async def submit_batch(self, questions: List[str]) -> str:
+        """Submit independent questions to the Batch API for offline processing.
+        
+        Batched requests are cheaper and use a separate rate-limit pool, but may take
+        up to 24 hours to complete. MCP commands in the answers are not executed.
+        
+        Args:
+            questions: The questions to ask
+            
+        Returns:
+            str: The batch ID to pass to wait_for_batch
+        """
+        system_messages = await self._get_system_messages()
+        lines = [
+            _dumps({
+                "custom_id": f"question-{index}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": self.model,
+                    "messages": [*system_messages, {"role": "user", "content": question}]
+                }
+            })
+            for index, question in enumerate(questions)
+        ]
+        
+        batch_file = await self.client.files.create(
+            file=("clibot_batch.jsonl", "\n".join(lines).encode()),
+            purpose="batch"
+        )
+        batch = await self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        
+        if self.config.verbose:
+            ui.print_verbose("Submitted batch %s with %s requests", batch.id, len(questions))
+        
+        return batch.id
+    
+    async def wait_for_batch(self, batch_id: str, poll_interval: float = 30.0) -> List[str]:
+        """Wait for a batch submitted with submit_batch and return its answers.
+        
+        Args:
+            batch_id: The batch ID returned by submit_batch
+            poll_interval: Seconds between status checks
+            
+        Returns:
+            list: The answers, in the same order as the submitted questions
+        """
+        while True:
+            batch = await self.client.batches.retrieve(batch_id)
+            if batch.status == "completed":
+                break
+            if batch.status in ("failed", "expired", "cancelled"):
+                raise RuntimeError(f"Batch {batch_id} {batch.status}")
+            
+            if self.config.verbose:
+                ui.print_verbose("Batch %s is %s, waiting...", batch_id, batch.status)
+            await asyncio.sleep(poll_interval)
+        
+        answers = {}
+        if batch.output_file_id:
+            output = await self.client.files.content(batch.output_file_id)
+            for line in output.text.splitlines():
+                if not line.strip():
+                    continue
+                entry = json_codec.loads(line)
+                index = int(entry["custom_id"].rsplit("-", 1)[1])
+                response = entry.get("response") or {}
+                choices = (response.get("body") or {}).get("choices")
+                if choices:
+                    answers[index] = choices[0]["message"]["content"] or ""
+                else:
+                    error = entry.get("error") or response
+                    answers[index] = f"Error: Failed to get a response from the AI service. {error}"
+        
+        total = batch.request_counts.total if batch.request_counts else len(answers)
+        return [
+            answers.get(index, "Error: No response returned for this request.")
+            for index in range(total)
+        ]
+    
+    async def marshal_ask(self, questions: List[str], group_size: int = 10) -> List[str]:
+        """Ask independent questions by combining several into each request.
+        
+        Questions are sent in groups of up to group_size as numbered sections of one
+        prompt, and the numbered answers are split out of each reply. This saves the
+        per-request overhead, including resending the system prompt, for many short
+        questions. Groups are sent concurrently like batch_ask.
+        
+        Args:
+            questions: The questions to ask
+            group_size: Maximum number of questions per request
+            
+        Returns:
+            list: The answers, in the same order as the questions
+        """
+        groups = [
+            questions[start:start + group_size]
+            for start in range(0, len(questions), group_size)
+        ]
+        prompts = [
+            _MARSHAL_INSTRUCTION + "".join(
+                f"\n\n### Question {number}\n{question}"
+                for number, question in enumerate(group, 1)
+            )
+            for group in groups
+        ]
+        replies = await self.batch_ask(prompts)
+        
+        answers = []
+        for group, reply in zip(groups, replies):
+            # Split the reply into [preamble, number, answer, number, answer, ...]
+            parts = _ANSWER_PATTERN.split(reply)
+            numbered = {
+                int(number): answer.strip()
+                for number, answer in zip(parts[1::2], parts[2::2])
+            }
+            for number in range(1, len(group) + 1):
+                if number in numbered:
+                    answers.append(numbered[number])
+                elif reply.startswith("Error:"):
+                    answers.append(reply)
+                else:
+                    answers.append("Error: No answer returned for this question.")
+        return answers
     
-    def _execute_mcp_command_with_retry(
+    async def ask_many(self, questions: List[str], mode: str = "parallel") -> List[str]:
+        """Ask many independent questions without conversation history.
+        
+        Args:
+            questions: The questions to ask
+            mode: "parallel" to send concurrent requests, "marshal" to combine several
+                questions into each request, or "batch" to use the Batch API, which is
+                cheaper but may take up to 24 hours
+            
+        Returns:
+            list: The answers, in the same order as the questions
+        """
+        if mode == "parallel":
+            return await self.batch_ask(questions)
+        if mode == "marshal":
+            return await self.marshal_ask(questions)
+        if mode == "batch":
+            batch_id = await self.submit_batch(questions)
+            return await self.wait_for_batch(batch_id)
+        raise ValueError(f"Unknown mode '{mode}', expected parallel, marshal or batch")
+    
+    def _execute_internal_command(self, tool: str, args: List[str]) -> Tuple[Any, bool, int]:
+        """Execute a command addressed to CliBot itself rather than an MCP server.
+        
+        Returns:
+            tuple: (result_or_error, success_flag, attempt_count), as returned by
+                _execute_mcp_command_with_retry
+        """
+        if tool != "fetch_result":
+            return f"Unknown internal command: {tool}", False, 1
+        if not args or args[0] not in self._result_store:
+            return f"Unknown result reference: {' '.join(args)}", False, 1
+        
+        # Pages are capped like other results, so a fetched result can't flood the
+        # history; accept both "4096" and "offset=4096"
+        offset = args[1].rpartition("=")[2] if len(args) > 1 else "0"
+        if not offset.isdigit():
+            return f"Invalid offset: {args[1]}", False, 1
+        offset = int(offset)
+        result_json = self._result_store[args[0]]
+        end = offset + self.config.mcp_result_max_chars
+        page = {"result_ref": args[0], "offset": offset, "content": result_json[offset:end]}
+        if end < len(result_json):
+            page["next_offset"] = end
+        return page, True, 1
+    
+    async def _execute_mcp_command_with_retry(
         self, server: str, tool: str, args: List[str]
     ) -> Tuple[Any, bool, int]:
         """Execute an MCP command with retry logic.
@@ -514,27 +1148,59 @@ class AIService:
                 - success_flag: True if command succeeded, False otherwise
                 - attempt_count: Number of attempts made
         """
+        # Don't run a command that already failed repeatedly with the same arguments
+        command_key = (server, tool, tuple(args))
+        failure_count, last_error = self._recent_errors.get(command_key, (0, None))
+        if failure_count >= _MAX_REPEATED_FAILURES:
+            if self.config.verbose:
+                ui.print_verbose("Skipping %s.%s, it failed %s times", server, tool, failure_count)
+            return f"{last_error} (not retried, failed {failure_count} times)", False, 0
+        
+        result, success, attempt_count = await self._execute_with_backoff(server, tool, args)
+        if success:
+            self._recent_errors.pop(command_key, None)
+        else:
+            self._recent_errors[command_key] = (failure_count + 1, result)
+        return result, success, attempt_count
+    
+    async def _execute_with_backoff(
+        self, server: str, tool: str, args: List[str]
+    ) -> Tuple[Any, bool, int]:
+        """Execute an MCP command, retrying transient errors with backoff.
+        
+        Returns:
+            tuple: (result_or_error, success_flag, attempt_count), as returned by
+                _execute_mcp_command_with_retry
+        """
         attempt_count = 0
         max_attempts = self.max_retry_attempts
         last_error = None
         
         while attempt_count < max_attempts:
+            if attempt_count:
+                # Back off exponentially with jitter before retrying
+                delay = min(_RETRY_MAX_DELAY, _RETRY_BASE_DELAY * 2 ** (attempt_count - 1))
+                await asyncio.sleep(delay * random.uniform(0.5, 1.0))
             attempt_count += 1
             
             if self.config.verbose:
-                ui.print_verbose(f"Attempt {attempt_count}/{max_attempts} for {server}.{tool}")
+                ui.print_verbose(
+                    "Attempt %s/%s for %s.%s", attempt_count, max_attempts, server, tool
+                )
             
             try:
                 # Execute the command
-                result = self.mcp_manager.execute_mcp_command(server, tool, args)
+                result = await self.mcp_manager.aexecute_mcp_command(server, tool, args)
                 
                 # Check if the result indicates an error
                 if self._is_error_result(result):
                     error_message = self._extract_error_message(result)
                     if self.config.verbose:
-                        ui.print_verbose(f"Command returned error: {error_message}")
+                        ui.print_verbose("Command returned error: %s", error_message)
                     
                     last_error = error_message
+                    if self._is_permanent_error(result):
+                        break
                     # Continue to the next attempt
                     continue
                 
@@ -544,10 +1210,13 @@ class AIService:
             except Exception as e:
                 last_error = str(e)
                 if self.config.verbose:
-                    ui.print_verbose(f"Error executing command: {last_error}")
+                    ui.print_verbose("Error executing command: %s", last_error)
+                # Configuration errors, such as an unknown server, will not go away
+                if isinstance(e.__cause__ or e, ValueError):
+                    break
                 # Continue to the next attempt
         
-        # All attempts failed
+        # All attempts failed, or the error was not retryable
         return last_error, False, attempt_count
     
     def _is_error_result(self, result) -> bool:
@@ -565,26 +1234,41 @@ class AIService:
             
         if isinstance(result, dict):
             # Check for error fields in the result dictionary
-            error_keys = ['error', 'errors', 'exception', 'fault']
-            for key in error_keys:
-                if key in result and result[key]:
-                    return True
+            if any(result[key] for key in result.keys() & _ERROR_KEYS):
+                return True
                     
             # Check for status fields indicating failure
-            if 'status' in result:
-                status = result['status']
-                if isinstance(status, str) and status.lower() in ['error', 'failed', 'failure']:
-                    return True
-                if isinstance(status, int) and status >= 400:
-                    return True
+            status = result.get('status')
+            if isinstance(status, str) and status.casefold() in _FAIL_STATUSES:
+                return True
+            if isinstance(status, int) and status >= 400:
+                return True
                     
             # Check for success field explicitly set to false
-            if 'success' in result and result['success'] is False:
+            if result.get('success') is False:
                 return True
         
         # If we get here, assume the result is valid
         return False
     
+    def _is_permanent_error(self, result) -> bool:
+        """Check if an MCP error result will fail the same way when retried.
+        
+        Client errors (HTTP 4xx status) are permanent, except for timeouts and rate
+        limiting.
+        
+        Args:
+            result: The MCP command result, already known to be an error
+            
+        Returns:
+            bool: True if the command should not be retried, False otherwise
+        """
+        if isinstance(result, dict):
+            status = result.get('status')
+            if isinstance(status, int) and 400 <= status < 500:
+                return status not in (408, 429)
+        return False
+    
     def _extract_error_message(self, result) -> str:
         """Extract a human-readable error message from an MCP result.
         
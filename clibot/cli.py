@@ -7,7 +7,7 @@ from typing import Dict, List, Optional
 import typer
 
 from . import ui
-from .ai_service import AIService
+from .event_loop import new_event_loop
 from .config import Config
 from .mcp_tools import MCPToolsManager
 
@@ -22,6 +22,7 @@ app.add_typer(mcp_app, name="mcp")
 config = None
 mcp_manager = None
 ai_service = None
+event_loop = None
 
 # Define common options
 CONFIG_OPTION = typer.Option(
@@ -31,6 +32,7 @@ CONFIG_OPTION = typer.Option(
     help="Path to MCP config file"
 )
 VERBOSE_OPTION = typer.Option(False, "--verbose", "-v", help="Enable verbose output")
+NO_CACHE_OPTION = typer.Option(False, "--no-cache", help="Don't use cached responses")
 
 # Define common arguments
 SERVER_ARGUMENT = typer.Argument(..., help="MCP server name")
@@ -40,10 +42,29 @@ QUESTION_ARGUMENT = typer.Argument(..., help="Question to ask the AI assistant")
 
 def initialize(config_path: Optional[str] = None, verbose: bool = False):
     """Initialize global instances."""
-    global config, mcp_manager, ai_service
+    global config, mcp_manager
     config = Config(config_path, verbose=verbose)
+    ui.set_verbose(config.verbose)
     mcp_manager = MCPToolsManager(config)
-    ai_service = AIService(config, mcp_manager=mcp_manager)
+
+def get_ai_service():
+    """Get the AI service, creating it on first use.
+    
+    The AI service module is imported here rather than at the top, so commands that
+    don't talk to the AI, like listing MCP servers, skip loading the OpenAI client.
+    """
+    global ai_service
+    if ai_service is None:
+        from .ai_service import AIService
+        ai_service = AIService(config, mcp_manager=mcp_manager)
+    return ai_service
+
+def run_async(coro):
+    """Run a coroutine on the CLI event loop, reused across calls."""
+    global event_loop
+    if event_loop is None:
+        event_loop = new_event_loop()
+    return event_loop.run_until_complete(coro)
 
 @app.callback()
 def callback(
@@ -58,21 +79,34 @@ def callback(
     
     if verbose:
         ui.print_verbose("Verbose mode enabled")
-        ui.print_verbose(f"Using model: {config.openai_model}")
+        ui.print_verbose("Using model: %s", config.openai_model)
 
 @app.command("ask")
 def ask(
     question: str = QUESTION_ARGUMENT,
-    verbose: bool = VERBOSE_OPTION
+    verbose: bool = VERBOSE_OPTION,
+    no_cache: bool = NO_CACHE_OPTION
 ):
     """Ask a one-off question to the AI assistant."""
     if verbose and config and not config.verbose:
         config.verbose = True
+        ui.set_verbose(True)
         ui.print_verbose("Verbose mode enabled for this command")
     
-    with ui.show_spinner():
-        response = ai_service.ask(question)
-    ui.print_ai_message(response)
+    if no_cache:
+        config.cache_enabled = False
+    
+    service = get_ai_service()
+    try:
+        if config.stream:
+            run_async(service.ask(question))
+        else:
+            with ui.show_spinner():
+                response = run_async(service.ask(question))
+            ui.print_ai_message(response)
+    finally:
+        run_async(service.close())
+        mcp_manager.close()
 
 @app.command("chat")
 def chat(
@@ -81,22 +115,33 @@ def chat(
     """Start an interactive chat session with the AI assistant."""
     if verbose and config and not config.verbose:
         config.verbose = True
+        ui.set_verbose(True)
         ui.print_verbose("Verbose mode enabled for this session")
     
+    service = get_ai_service()
     ui.print_welcome()
     
-    while True:
-        user_input = ui.get_user_input()
-        
-        if user_input.lower() in ("exit", "quit"):
-            break
-        
-        ui.print_user_message(user_input)
-        
-        with ui.show_spinner():
-            response = ai_service.chat(user_input)
-        
-        ui.print_ai_message(response)
+    # Also clean up when the session ends with Ctrl-C or EOF, which exit the process
+    try:
+        while True:
+            user_input = ui.get_user_input()
+            
+            if user_input.lower() in ("exit", "quit"):
+                break
+            
+            ui.print_user_message(user_input)
+            
+            if config.stream:
+                run_async(service.chat(user_input))
+                continue
+            
+            with ui.show_spinner():
+                response = run_async(service.chat(user_input))
+            
+            ui.print_ai_message(response)
+    finally:
+        run_async(service.close())
+        mcp_manager.close()
 
 @mcp_app.command("list-servers")
 def list_mcp_servers(
@@ -105,6 +150,7 @@ def list_mcp_servers(
     """List available MCP servers."""
     if verbose and config and not config.verbose:
         config.verbose = True
+        ui.set_verbose(True)
         ui.print_verbose("Verbose mode enabled for this command")
     
     servers = config.list_mcp_servers()
@@ -122,14 +168,18 @@ def list_mcp_tools(
     """List available tools for an MCP server."""
     if verbose and config and not config.verbose:
         config.verbose = True
+        ui.set_verbose(True)
         ui.print_verbose("Verbose mode enabled for this command")
     
     if server not in config.list_mcp_servers():
         ui.print_error(f"MCP server '{server}' not found in configuration")
         raise typer.Exit(1)
     
-    tools = mcp_manager.list_available_tools(server)
-    ui.print_mcp_tools(server, tools)
+    try:
+        tools = mcp_manager.list_available_tools(server)
+        ui.print_mcp_tools(server, tools)
+    finally:
+        mcp_manager.close()
 
 @mcp_app.command("run")
 def run_mcp_command(
@@ -141,6 +191,7 @@ def run_mcp_command(
     """Run an MCP command on the specified server."""
     if verbose and config and not config.verbose:
         config.verbose = True
+        ui.set_verbose(True)
         ui.print_verbose("Verbose mode enabled for this command")
     
     try:
@@ -150,6 +201,8 @@ def run_mcp_command(
     except Exception as e:
         ui.print_error(str(e))
         raise typer.Exit(1) from None
+    finally:
+        mcp_manager.close()
 
 def main():
     """Main entry point for the CLI."""
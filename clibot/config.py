@@ -1,6 +1,5 @@
 """Configuration module for CliBot."""
 
-import json
 import os
 from pathlib import Path
 from typing import Dict, List, Optional
@@ -38,6 +37,61 @@ class Config:
             verbose_env = os.getenv("CLIBOT_VERBOSE", "false").lower()
             self.verbose = verbose_env in ("true", "1", "yes", "y")
         
+        # Also print tracebacks of MCP errors in verbose output
+        debug_env = os.getenv("CLIBOT_DEBUG", "false").lower()
+        self.debug = debug_env in ("true", "1", "yes", "y")
+        
+        # Stream responses as they are generated unless disabled via environment variable
+        stream_env = os.getenv("CLIBOT_STREAM", "true").lower()
+        self.stream = stream_env in ("true", "1", "yes", "y")
+        
+        # Keep the system prompt fixed for the whole session so provider-side prompt
+        # caching keeps matching even if MCP tools change
+        stable_prefix_env = os.getenv("CLIBOT_STABLE_PREFIX", "false").lower()
+        self.stable_prefix = stable_prefix_env in ("true", "1", "yes", "y")
+        
+        # Response cache settings
+        no_cache_env = os.getenv("CLIBOT_NO_CACHE", "false").lower()
+        self.cache_enabled = no_cache_env not in ("true", "1", "yes", "y")
+        self.cache_dir = str(Path(os.getenv("CLIBOT_CACHE_DIR", "~/.cache/clibot")).expanduser())
+        self.embedding_model = os.getenv("CLIBOT_EMBEDDING_MODEL")
+        
+        # Seconds that final answers to one-off questions are reused, 0 to disable
+        self.ask_cache_ttl = int(os.getenv("CLIBOT_ASK_CACHE_TTL", "86400"))
+        
+        # Name patterns of MCP tools with side effects; answers that ran them are never cached
+        side_effect_tools_env = os.getenv(
+            "CLIBOT_MCP_SIDE_EFFECT_TOOLS", "trigger_*,create_*,delete_*,write_*"
+        )
+        self.mcp_side_effect_tools = [
+            pattern.strip() for pattern in side_effect_tools_env.split(",") if pattern.strip()
+        ]
+        
+        # Seconds that MCP tool listings are cached before asking the server again
+        self.mcp_tools_cache_ttl = float(os.getenv("CLIBOT_MCP_TOOLS_CACHE_TTL", "300"))
+        
+        # Name patterns of read-only MCP tools whose results may be cached, none by default
+        cacheable_tools_env = os.getenv("CLIBOT_MCP_CACHEABLE_TOOLS", "")
+        self.mcp_cacheable_tools = [
+            pattern.strip() for pattern in cacheable_tools_env.split(",") if pattern.strip()
+        ]
+        
+        # Maximum number of concurrent tool calls sent to one MCP server
+        self.mcp_max_concurrent_calls = int(os.getenv("CLIBOT_MCP_MAX_CONCURRENT_CALLS", "8"))
+        
+        # Maximum characters of JSON per MCP result sent to the model in full
+        self.mcp_result_max_chars = int(os.getenv("CLIBOT_MCP_RESULT_MAX_CHARS", "4096"))
+        
+        # Skip the follow-up request when a response already explains its MCP commands
+        skip_followup_env = os.getenv("CLIBOT_SKIP_FOLLOWUP", "false").lower()
+        self.skip_followup = skip_followup_env in ("true", "1", "yes", "y")
+        
+        # Maximum characters of conversation history kept before dropping the oldest messages
+        self.max_history_chars = int(os.getenv("CLIBOT_MAX_HISTORY_CHARS", "100000"))
+        
+        # Maximum number of concurrent requests for batched questions
+        self.max_parallel_requests = int(os.getenv("CLIBOT_MAX_PARALLEL_REQUESTS", "4"))
+        
     def _load_mcp_config(self, config_path: Optional[str] = None) -> MCPConfig:
         """Load MCP configuration from file."""
         if config_path:
@@ -58,10 +112,8 @@ class Config:
                 # No config found, return empty config
                 return MCPConfig(mcpServers={})
         
-        with open(path, "r") as f:
-            config_data = json.load(f)
-            
-        return MCPConfig(**config_data)
+        # Parse and validate in a single pass in pydantic-core
+        return MCPConfig.model_validate_json(path.read_bytes())
     
     def get_mcp_server(self, server_name: str) -> Optional[MCPServer]:
         """Get configuration for a specific MCP server."""
@@ -0,0 +1,19 @@
+"""Event loop creation for CliBot, with uvloop if available."""
+
+import asyncio
+
+try:
+    import uvloop
+
+    HAS_UVLOOP = True
+except ImportError:
+    HAS_UVLOOP = False
+
+
+def new_event_loop() -> asyncio.AbstractEventLoop:
+    """Create an event loop, a uvloop one if available for faster I/O.
+
+    Loops are created explicitly rather than through a global event loop policy,
+    which is deprecated as of Python 3.14.
+    """
+    return uvloop.new_event_loop() if HAS_UVLOOP else asyncio.new_event_loop()
@@ -0,0 +1,58 @@
+"""JSON encoding and decoding for CliBot, with orjson if available."""
+
+import json
+from typing import Any, Callable, Optional, Union
+
+try:
+    import orjson
+
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Decode a JSON document."""
+    return orjson.loads(data) if HAS_ORJSON else json.loads(data)
+
+
+def dumps_bytes(
+    obj: Any,
+    default: Optional[Callable[[Any], Any]] = None,
+    indent: bool = False,
+    sort_keys: bool = False,
+) -> bytes:
+    """Encode an object as UTF-8 JSON, compact or indented by two spaces.
+
+    Non-string dict keys are converted to strings. Objects orjson can't encode, such
+    as integers beyond 64 bits, are encoded by the stdlib encoder instead, which
+    produces the same bytes.
+    """
+    if HAS_ORJSON:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=default, option=option)
+        except TypeError:
+            pass
+    return json.dumps(
+        obj,
+        default=default,
+        indent=2 if indent else None,
+        separators=None if indent else (",", ":"),
+        sort_keys=sort_keys,
+        ensure_ascii=False,
+    ).encode()
+
+
+def dumps(
+    obj: Any,
+    default: Optional[Callable[[Any], Any]] = None,
+    indent: bool = False,
+    sort_keys: bool = False,
+) -> str:
+    """Encode an object as a JSON string, like dumps_bytes."""
+    return dumps_bytes(obj, default=default, indent=indent, sort_keys=sort_keys).decode()
@@ -0,0 +1,159 @@
+"""LLM response cache for CliBot."""
+
+import hashlib
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Deque, List, Optional, Tuple
+
+try:
+    import diskcache
+
+    HAS_DISKCACHE = True
+except ImportError:
+    HAS_DISKCACHE = False
+
+from . import json_codec
+
+# Disk cache key holding the entries used for semantic matching
+_SEMANTIC_KEY = "__semantic_answers__"
+
+
+def _normalize(text: str) -> str:
+    """Normalize a question for exact matching: casefold and collapse whitespace."""
+    return " ".join(text.casefold().split())
+
+
+def _cosine_similarity(a: List[float], b: List[float]) -> float:
+    """Compute the cosine similarity of two vectors."""
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    if not norm:
+        return 0.0
+    return dot / norm
+
+
+class LLMCache:
+    """Cache for LLM responses.
+
+    Exact matches are looked up by a SHA256 key over the model and messages, kept in
+    an in-memory LRU and optionally persisted with diskcache, optionally expiring.
+    Responses can also be matched semantically by comparing the embedding of a
+    query, computed by the caller, against the most recent entries stored under the
+    same context key.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        cache_dir: Optional[str] = None,
+        similarity_threshold: float = 0.92,
+        semantic_window: int = 64,
+    ):
+        """Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of exact-match entries kept in memory
+            cache_dir: Optional directory for persisting entries with diskcache
+            similarity_threshold: Minimum cosine similarity for a semantic hit
+            semantic_window: Number of recent entries compared for semantic hits
+        """
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        # Key -> (response, expiry time or None)
+        self._entries: OrderedDict[str, Tuple[str, Optional[float]]] = OrderedDict()
+        self._disk = diskcache.Cache(cache_dir) if cache_dir and HAS_DISKCACHE else None
+        # (context key, embedding, response, expiry time or None)
+        self._semantic_entries: Deque[Tuple[str, List[float], str, Optional[float]]] = deque(
+            self._disk.get(_SEMANTIC_KEY, ()) if self._disk is not None else (),
+            maxlen=semantic_window
+        )
+
+    @staticmethod
+    def make_key(model: str, messages: List[dict], normalize: bool = False) -> str:
+        """Build the exact-match cache key for a request.
+
+        With `normalize`, user messages are normalized first, so questions differing
+        only in case or whitespace share an entry.
+        """
+        if normalize:
+            messages = [
+                {**message, "content": _normalize(message["content"])}
+                if message["role"] == "user" and isinstance(message["content"], str)
+                else message
+                for message in messages
+            ]
+        request = {"model": model, "messages": messages}
+        payload = json_codec.dumps_bytes(request, sort_keys=True)
+        return hashlib.sha256(payload).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached response by exact key."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            response, expires_at = entry
+            if expires_at is None or expires_at > time.time():
+                self._entries.move_to_end(key)
+                return response
+            del self._entries[key]
+
+        if self._disk is not None:
+            response, expires_at = self._disk.get(key, expire_time=True)
+            if response is not None:
+                self._remember(key, response, expires_at)
+                return response
+
+        return None
+
+    def set(
+        self, key: str, response: str, expire: Optional[float] = None, persist: bool = True
+    ) -> None:
+        """Store a response under an exact key, expiring after `expire` seconds if given.
+
+        Entries stored with `persist` False are kept in memory only.
+        """
+        expires_at = time.time() + expire if expire is not None else None
+        self._remember(key, response, expires_at)
+        if persist and self._disk is not None:
+            self._disk.set(key, response, expire=expire)
+
+    def get_similar(self, context: str, embedding: List[float]) -> Optional[str]:
+        """Get a cached response for a query with a similar embedding.
+
+        Only entries stored under the same context key are compared, so a query is
+        never matched against one asked with another model or system prompt.
+        """
+        now = time.time()
+        best_score = 0.0
+        best_response = None
+        for entry_context, entry_embedding, response, expires_at in self._semantic_entries:
+            if entry_context != context or (expires_at is not None and expires_at <= now):
+                continue
+            score = _cosine_similarity(embedding, entry_embedding)
+            if score > best_score:
+                best_score = score
+                best_response = response
+
+        if best_score > self.similarity_threshold:
+            return best_response
+        return None
+
+    def set_similar(
+        self,
+        context: str,
+        embedding: List[float],
+        response: str,
+        expire: Optional[float] = None,
+    ) -> None:
+        """Store a response for semantic matching under a context key and query embedding."""
+        expires_at = time.time() + expire if expire is not None else None
+        self._semantic_entries.append((context, embedding, response, expires_at))
+        if self._disk is not None:
+            self._disk.set(_SEMANTIC_KEY, list(self._semantic_entries))
+
+    def _remember(self, key: str, response: str, expires_at: Optional[float] = None) -> None:
+        """Insert an entry into the in-memory LRU."""
+        self._entries[key] = (response, expires_at)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -1,149 +1,214 @@
 """MCP tools integration for CliBot."""
 
-import json
-import shlex
-import subprocess
-from typing import Any, Dict, List, Optional
+import fnmatch
+import functools
+import hashlib
+import math
 import os
+import shlex
+import tempfile
+import threading
+import traceback
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional
 import time
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from pathlib import Path
 
-from mcp import ClientSession, StdioServerParameters
+import anyio
+from mcp import ClientSession, StdioServerParameters, types
 from mcp.client.stdio import stdio_client
 
-from . import ui
+try:
+    from mcp.shared.exceptions import McpError
+except ImportError:
+    # Renamed in mcp 2
+    from mcp.shared.exceptions import MCPError as McpError
+
+try:
+    import msgpack
+
+    HAS_MSGPACK = True
+except ImportError:
+    HAS_MSGPACK = False
+
+from . import json_codec, ui
 from .config import Config
+from .event_loop import new_event_loop
+
+# Maximum number of tool results kept in the result cache
+_MAX_CACHED_RESULTS = 256
+
+# JSON-RPC error code the MCP SDK reports for a dropped connection
+_CONNECTION_CLOSED = -32000
+
+# Errors raised when a server's stdio streams are broken
+_TRANSPORT_ERRORS = (
+    OSError, anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream
+)
+
+# Characters a JSON document can start with
+_JSON_START_CHARS = frozenset('{["-0123456789tfn \t\r\n')
+
+@functools.lru_cache(maxsize=256)
+def _split_arguments(args_str: str) -> tuple:
+    """Split tool arguments with shlex, memoized since agents often repeat commands."""
+    return tuple(shlex.split(args_str))
+
+class _ToolRecord(NamedTuple):
+    """A tool from a tools listing."""
+    
+    name: str
+    description: Optional[str]
+    parameters: Dict[str, Any]
+
+def _iter_tools(tools_data: Any) -> Iterator[_ToolRecord]:
+    """Yield the tools of a tools listing, whatever shape the listing has.
+    
+    Listings are ListToolsResult objects from the MCP SDK, possibly wrapped in a
+    tuple, or lists and dicts of tool dicts.
+    """
+    if isinstance(tools_data, tuple):
+        tools_data = tools_data[0] if tools_data else []
+    if isinstance(tools_data, dict):
+        tools_data = tools_data.get("tools", [])
+    elif not isinstance(tools_data, list):
+        tools_data = getattr(tools_data, "tools", None) or []
+    
+    for tool in tools_data:
+        if isinstance(tool, dict):
+            name = tool.get("name")
+            description = tool.get("description")
+            parameters = tool.get("parameters") or tool.get("inputSchema") or {}
+        else:
+            name = getattr(tool, "name", None)
+            description = getattr(tool, "description", None)
+            parameters = getattr(tool, "inputSchema", getattr(tool, "input_schema", None)) or {}
+        if name:
+            yield _ToolRecord(name, description, parameters)
+
+def _parse_arguments(args: List[str]) -> Dict[str, Any]:
+    """Parse key=value tool arguments into a dictionary, decoding JSON values.
+    
+    A single argument holding a JSON object is used as the arguments as a whole.
+    Values that can't start a JSON document, like most plain strings, are kept as
+    strings without attempting to parse them, which would fail with an exception.
+    """
+    if len(args) == 1 and args[0][:1] == "{":
+        try:
+            params = json_codec.loads(args[0])
+        except ValueError:
+            params = None
+        if isinstance(params, dict):
+            return params
+    
+    params = {}
+    for arg in args:
+        key, sep, value = arg.partition("=")
+        if sep:
+            if value[:1] in _JSON_START_CHARS:
+                try:
+                    value = json_codec.loads(value)
+                except ValueError:
+                    # Keep as string if not valid JSON
+                    pass
+            params[key] = value
+    return params
+
+def _pack_result(result: Any) -> tuple:
+    """Pack a tool result for the result cache, compactly with msgpack if available."""
+    if HAS_MSGPACK and hasattr(result, "model_dump"):
+        data = msgpack.packb(result.model_dump(mode="json", by_alias=True), use_bin_type=True)
+        return type(result), data
+    return None, result
+
+def _allows_caching(result: Any) -> bool:
+    """Check that a tool result is a success its server didn't mark as uncacheable."""
+    if getattr(result, "isError", getattr(result, "is_error", False)):
+        return False
+    meta = getattr(result, "meta", None) or {}
+    return meta.get("cache_hint") != "no-cache"
+
+def _unpack_result(entry: tuple) -> Any:
+    """Rebuild a tool result packed with _pack_result."""
+    result_type, data = entry
+    if result_type is None:
+        return data
+    return result_type.model_validate(msgpack.unpackb(data, raw=False))
+
+def _is_connection_error(error: Exception) -> bool:
+    """Check whether an error means the connection to a server is broken."""
+    if isinstance(error, McpError):
+        return error.error.code == _CONNECTION_CLOSED
+    return isinstance(error, _TRANSPORT_ERRORS)
 
 class MCPToolsManager:
     """Manager for MCP tools execution."""
     
     def __init__(self, config: Config):
         self.config = config
-        self.processes = {}  # Cache for MCP server processes
-        self._executor = ThreadPoolExecutor(max_workers=4)
+        self._server_params = {}  # server_name -> stdio parameters for its session
+        
+        # Event loop owning the MCP sessions, run in a background thread so that
+        # sessions stay connected across sync and async calls
+        self._loop = new_event_loop()
+        self._loop_thread = threading.Thread(
+            target=self._loop.run_forever, name="clibot-mcp", daemon=True
+        )
+        self._loop_thread.start()
+        
+        # Persistent sessions: server_name -> (owner task, session future, close event)
+        self._sessions = {}
+        # Per-server semaphores bounding concurrent tool calls on one session
+        self._call_limits = {}
         
         # Cache for tools and descriptions
         self._tools_cache = {}  # server_name -> list of tools
+        self._listings = {}  # server_name -> list_tools result shared by the lookups below
+        self._tools_fetched_at = {}  # server_name -> monotonic time tools were listed
         self._descriptions_cache = {}  # server_name -> tool_descriptions
         self._schema_cache = {}  # server_name:tool_name -> schema
         
+        # Tools listings are persisted across runs, so a new run can build its tools
+        # catalog without connecting to unchanged servers
+        self._tools_file = None
+        if self.config.cache_enabled:
+            self._tools_file = Path(self.config.cache_dir) / "mcp_tools.json"
+            self._load_persisted_tools()
+        self._result_cache = OrderedDict()  # (server_name, tool_name, args) -> packed result
+        # The result cache is filled on the MCP loop thread and invalidated from the
+        # caller's thread
+        self._result_lock = threading.Lock()
+        
+        # Callbacks notified when cached tools are invalidated
+        self._tools_listeners = []
+        
         # Pre-initialize tools and descriptions for all servers if verbose mode is enabled
         if self.config.verbose:
             ui.print_verbose("=== Pre-initializing MCP Tools ===")
-            for server in self.config.list_mcp_servers():
-                self._preload_server_tools(server)
+            servers = self.config.list_mcp_servers()
+            self.list_all_tools(servers)
+            self.get_all_tool_descriptions(servers)
             ui.print_verbose("=== MCP Tools Pre-initialization Complete ===")
     
-    def _preload_server_tools(self, server_name: str) -> None:
-        """Preload tools and descriptions for a server to avoid redundant initializations."""
-        try:
-            # Define a combined operation that gets both tools and descriptions in one session
-            async def combined_operation(session):
-                # Get tools list
-                tools_data = await session.list_tools()
-                
-                # Extract tool names
-                tool_names = []
-                
-                # Handle ListToolsResult type (from MCP SDK)
-                if hasattr(tools_data, "tools") and isinstance(tools_data.tools, list):
-                    tool_names = [tool.name for tool in tools_data.tools if hasattr(tool, "name")]
-                    
-                    # Also extract descriptions in the same operation
-                    descriptions = {}
-                    for tool in tools_data.tools:
-                        if hasattr(tool, "name"):
-                            name = tool.name
-                            description = (
-                                tool.description if hasattr(tool, "description") else f"{name} tool"
-                            )
-                            descriptions[name] = description
-                # Handle tuple type
-                elif isinstance(tools_data, tuple) and len(tools_data) > 0:
-                    first_item = tools_data[0]
-                    if isinstance(first_item, list):
-                        tool_names = [tool.get("name") for tool in first_item if tool.get("name")]
-                    elif hasattr(first_item, "tools") and isinstance(first_item.tools, list):
-                        tool_names = [tool.name for tool in first_item.tools if hasattr(tool, "name")]
-                # Handle list type
-                elif isinstance(tools_data, list):
-                    tool_names = [tool.get("name") for tool in tools_data if tool.get("name")]
-                # Handle dictionary type
-                elif isinstance(tools_data, dict) and "tools" in tools_data:
-                    tool_names = [
-                        tool.get("name") for tool in tools_data["tools"] if tool.get("name")
-                    ]
-                
-                # Extract descriptions if not already done
-                if not descriptions:
-                    descriptions = {}
-                    tools_list = []
-                    
-                    if isinstance(tools_data, list):
-                        tools_list = tools_data
-                    elif isinstance(tools_data, dict) and "tools" in tools_data:
-                        tools_list = tools_data["tools"]
-                    elif isinstance(tools_data, tuple) and len(tools_data) > 0:
-                        first_item = tools_data[0]
-                        if isinstance(first_item, list):
-                            tools_list = first_item
-                        elif hasattr(first_item, "tools"):
-                            tools_list = first_item.tools
-                    
-                    for tool in tools_list:
-                        if isinstance(tool, dict):
-                            name = tool.get("name")
-                            description = tool.get("description") or f"{name} tool"
-                            if name:
-                                descriptions[name] = description
-                        elif hasattr(tool, "name"):
-                            name = tool.name
-                            description = (
-                                tool.description if hasattr(tool, "description") else f"{name} tool"
-                            )
-                            descriptions[name] = description
-                
-                return {"tool_names": tool_names, "descriptions": descriptions}
-            
-            # Only run the combined operation if we need either tools or descriptions
-            if server_name not in self._tools_cache or server_name not in self._descriptions_cache:
-                # Run the async operation in a new event loop
-                result = self._run_async(self._execute_with_session(server_name, combined_operation))
-                
-                # Store results in cache
-                if server_name not in self._tools_cache:
-                    tool_names = result["tool_names"]
-                    if self.config.verbose:
-                        msg = "Retrieved %i tools for server: %s" % (
-                            len(tool_names), server_name
-                        )
-                        ui.print_verbose(msg)
-                    self._tools_cache[server_name] = tool_names
-                
-                if server_name not in self._descriptions_cache:
-                    descriptions = result["descriptions"]
-                    if self.config.verbose:
-                        msg = "Retrieved descriptions for %i tools on server: %s" % (
-                            len(descriptions), server_name
-                        )
-                        ui.print_verbose(msg)
-                    self._descriptions_cache[server_name] = descriptions
-        except Exception as e:
-            if self.config.verbose:
-                ui.print_verbose(f"Error pre-initializing tools for {server_name}: {str(e)}")
-    
     def _run_async(self, coro):
-        """Run an async coroutine in a new event loop in a separate thread."""
-        loop = asyncio.new_event_loop()
+        """Run an async coroutine on the MCP event loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+    
+    async def _arun(self, coro):
+        """Run a coroutine on the MCP event loop from a coroutine on another loop.
         
-        try:
-            return loop.run_until_complete(coro)
-        finally:
-            loop.close()
+        The caller's loop keeps running while it waits, unlike with _run_async.
+        Sessions belong to the MCP loop, so their work can't run on the caller's loop.
+        """
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._loop))
     
     def _create_server_params(self, server_name: str) -> StdioServerParameters:
-        """Create server parameters for the specified server."""
+        """Create server parameters for the specified server, once per server."""
+        server_params = self._server_params.get(server_name)
+        if server_params is not None:
+            return server_params
+        
         server_config = self.config.get_mcp_server(server_name)
         if not server_config:
             raise ValueError("MCP server '%s' not found in configuration" % server_name)
@@ -156,356 +221,523 @@ class MCPToolsManager:
         )
         
         if self.config.verbose:
-            ui.print_verbose(f"Creating MCP client for server: {server_name}")
-            ui.print_verbose(f"Command: {server_config.command}")
-            ui.print_verbose(f"Args: {server_config.args}")
+            ui.print_verbose("Creating MCP client for server: %s", server_name)
+            ui.print_verbose("Command: %s", server_config.command)
+            ui.print_verbose("Args: %s", server_config.args)
         
+        self._server_params[server_name] = server_params
         return server_params
     
     async def _execute_with_session(self, server_name: str, operation):
-        """Execute an operation with a new session."""
-        server_params = self._create_server_params(server_name)
+        """Execute an operation with the server's persistent session."""
+        entry = self._session_entry(server_name)
+        try:
+            # Shield the shared future so one cancelled caller doesn't cancel it for all
+            session = await asyncio.shield(entry[1])
+            
+            # Execute the operation
+            return await operation(session)
+        except Exception as e:
+            if self.config.verbose:
+                ui.print_verbose(
+                    "Error in _execute_with_session for server %s: %s", server_name, e
+                )
+                if self.config.debug:
+                    ui.print_verbose("Traceback: %s", traceback.format_exc())
+            # Errors for a single request leave the session usable for the calls
+            # sharing it; only a broken connection is dropped, to reconnect next call
+            if _is_connection_error(e):
+                await self._close_session(server_name, entry)
+            raise
+    
+    def _session_entry(self, server_name: str) -> tuple:
+        """Get the (task, ready, closing) entry of a server's persistent session.
         
-        if self.config.verbose:
-            ui.print_verbose(f"Starting MCP session for server: {server_name}")
+        The session is connected on first use, and concurrent callers share a single
+        connection attempt through the ready future.
+        """
+        entry = self._sessions.get(server_name)
+        if entry is None or entry[0].done():
+            server_params = self._create_server_params(server_name)
+            
+            if self.config.verbose:
+                ui.print_verbose("Starting MCP session for server: %s", server_name)
+            
+            ready = self._loop.create_future()
+            closing = asyncio.Event()
+            task = self._loop.create_task(
+                self._run_session(server_name, server_params, ready, closing)
+            )
+            entry = (task, ready, closing)
+            self._sessions[server_name] = entry
+        
+        return entry
+    
+    async def _run_session(
+        self,
+        server_name: str,
+        server_params: StdioServerParameters,
+        ready: asyncio.Future,
+        closing: asyncio.Event
+    ) -> None:
+        """Own a server connection: open it, publish the session, and hold it open.
+        
+        The stdio client and session contexts must be entered and exited in the
+        same task, so this task keeps them open until asked to close.
+        """
+        async def message_handler(message) -> None:
+            # Server notifications are wrapped in a root model in some SDK versions
+            notification = getattr(message, "root", message)
+            if isinstance(notification, types.ToolListChangedNotification):
+                if self.config.verbose:
+                    ui.print_verbose("Tools changed on server: %s", server_name)
+                # Only mark the tools stale here; the caches are dropped on next use,
+                # from the thread using them
+                self._tools_fetched_at[server_name] = float("-inf")
+                for listener in self._tools_listeners:
+                    listener()
         
-        # Create a new session for each operation
         try:
             async with stdio_client(server_params) as (read, write):
-                async with ClientSession(read, write) as session:
+                async with ClientSession(read, write, message_handler=message_handler) as session:
                     # Initialize the session
                     await session.initialize()
-                    
-                    # Execute the operation
-                    result = await operation(session)
-                    return result
+                    ready.set_result(session)
+                    await closing.wait()
         except Exception as e:
-            if self.config.verbose:
-                ui.print_verbose(
-                    f"Error in _execute_with_session for server {server_name}: "
-                    f"{str(e)}"
-                )
-                import traceback
-                ui.print_verbose(
-                    f"Traceback: {traceback.format_exc()}"
-                )
-            raise
+            if not ready.done():
+                ready.set_exception(e)
+            elif self.config.verbose:
+                ui.print_verbose("MCP session closed with error: %s", e)
+        finally:
+            if not ready.done():
+                ready.cancel()
+    
+    async def _close_session(self, server_name: str, entry: Optional[tuple] = None) -> None:
+        """Close a server's persistent session, if one is open.
+        
+        With `entry`, that session is closed and only forgotten if it is still the
+        server's current one, so a stale call can't close a newer session.
+        """
+        if entry is None:
+            entry = self._sessions.pop(server_name, None)
+            if entry is None:
+                return
+        elif self._sessions.get(server_name) is entry:
+            del self._sessions[server_name]
+        
+        task, ready, closing = entry
+        closing.set()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        # Consume a connection error so it isn't reported as never retrieved
+        if ready.done() and not ready.cancelled():
+            ready.exception()
+    
+    async def _close_sessions(self) -> None:
+        """Close all persistent sessions."""
+        await asyncio.gather(
+            *(self._close_session(server_name) for server_name in list(self._sessions)),
+            return_exceptions=True
+        )
     
     def execute_mcp_command(
         self, server_name: str, tool_name: str, args: List[str] = None
     ) -> Any:
         """Execute an MCP command."""
+        return self._run_async(self._call_tool(server_name, tool_name, args))
+    
+    async def aexecute_mcp_command(
+        self, server_name: str, tool_name: str, args: List[str] = None
+    ) -> Any:
+        """Execute an MCP command from a coroutine running on another event loop."""
+        return await self._arun(self._call_tool(server_name, tool_name, args))
+    
+    async def _call_tool(
+        self, server_name: str, tool_name: str, args: Optional[List[str]]
+    ) -> Any:
+        """Execute an MCP command on the MCP event loop.
+        
+        Results of read-only tools, per the configured name patterns, are cached by
+        server, tool and arguments until the server's tools cache is invalidated, unless
+        the server sets a "no-cache" cache_hint in the result metadata.
+        """
         if args is None:
             args = []
         
         if self.config.verbose:
-            ui.print_verbose("Executing MCP command: %s.%s" % (server_name, tool_name))
+            ui.print_verbose("Executing MCP command: %s.%s", server_name, tool_name)
             if args:
-                ui.print_verbose("With arguments: %s" % args)
+                ui.print_verbose("With arguments: %s", args)
+        
+        cache_key = (server_name, tool_name, tuple(args))
+        cacheable = any(
+            fnmatch.fnmatchcase(tool_name, pattern)
+            for pattern in self.config.mcp_cacheable_tools
+        )
+        if cacheable:
+            with self._result_lock:
+                entry = self._result_cache.get(cache_key)
+                if entry is not None:
+                    self._result_cache.move_to_end(cache_key)
+            if entry is not None:
+                if self.config.verbose:
+                    ui.print_verbose("Using cached result for %s.%s", server_name, tool_name)
+                return _unpack_result(entry)
         
         try:
             # Define the async operation
             async def operation(session):
                 if self.config.verbose:
-                    ui.print_verbose(f"Calling tool for {tool_name} on {server_name}")
+                    ui.print_verbose("Calling tool for %s on %s", tool_name, server_name)
                 
                 # Convert args to a dictionary for the MCP SDK
-                params = {}
-                if args:
-                    # Parse args into a dictionary
-                    for arg in args:
-                        if "=" in arg:
-                            key, value = arg.split("=", 1)
-                            # Try to parse JSON values
-                            try:
-                                value = json.loads(value)
-                            except (json.JSONDecodeError, ValueError):
-                                # Keep as string if not valid JSON
-                                pass
-                            params[key] = value
+                params = _parse_arguments(args)
                 
                 if self.config.verbose:
-                    ui.print_verbose(f"Executing with parameters: {params}")
+                    ui.print_verbose("Executing with parameters: %s", params)
                 
-                # Execute the command using call_tool method
-                result = await session.call_tool(tool_name, arguments=params)
+                # Execute the command using call_tool method, multiplexed with other
+                # calls to the same server up to its concurrency limit
+                limit = self._call_limits.get(server_name)
+                if limit is None:
+                    limit = asyncio.Semaphore(self.config.mcp_max_concurrent_calls)
+                    self._call_limits[server_name] = limit
+                async with limit:
+                    result = await session.call_tool(tool_name, arguments=params)
                 
                 if self.config.verbose:
-                    ui.print_verbose(f"Command executed, result type: {type(result)}")
+                    ui.print_verbose("Command executed, result type: %s", type(result))
                 
                 # Return the raw result object
                 return result
             
-            # Run the async operation in a new event loop
-            result = self._run_async(self._execute_with_session(server_name, operation))
+            result = await self._execute_with_session(server_name, operation)
             
             if self.config.verbose:
                 ui.print_verbose("MCP command executed successfully")
             
+            if cacheable and _allows_caching(result):
+                entry = _pack_result(result)
+                with self._result_lock:
+                    self._result_cache[cache_key] = entry
+                    if len(self._result_cache) > _MAX_CACHED_RESULTS:
+                        self._result_cache.popitem(last=False)
+            
             # Return the raw result
             return result
             
         except Exception as e:
             if self.config.verbose:
-                ui.print_verbose("Exception during MCP command execution: %s" % str(e))
-                import traceback
-                ui.print_verbose(f"Traceback: {traceback.format_exc()}")
+                ui.print_verbose("Exception during MCP command execution: %s", e)
+                if self.config.debug:
+                    ui.print_verbose("Traceback: %s", traceback.format_exc())
             raise RuntimeError("MCP error: %s" % str(e)) from e
     
     def list_available_tools(self, server_name: str) -> List[str]:
         """List available tools for a specific MCP server."""
+        self._expire_tools_cache(server_name)
         if server_name in self._tools_cache:
             return self._tools_cache[server_name]
         
         try:
-            # Define the async operation
-            async def operation(session):
-                return await session.list_tools()
-            
-            # Run the async operation in a new event loop
-            tools_data = self._run_async(self._execute_with_session(server_name, operation))
-            
-            # Extract tool names, handling different data structures
-            tool_names = []
-            
-            # Handle ListToolsResult type (from MCP SDK)
-            if hasattr(tools_data, "tools") and isinstance(tools_data.tools, list):
-                tool_names = [tool.name for tool in tools_data.tools if hasattr(tool, "name")]
-            # Handle tuple type
-            elif isinstance(tools_data, tuple) and len(tools_data) > 0:
-                first_item = tools_data[0]
-                if isinstance(first_item, list):
-                    tool_names = [tool.get("name") for tool in first_item if tool.get("name")]
-                elif hasattr(first_item, "tools") and isinstance(first_item.tools, list):
-                    tool_names = [tool.name for tool in first_item.tools if hasattr(tool, "name")]
-            # Handle list type
-            elif isinstance(tools_data, list):
-                tool_names = [tool.get("name") for tool in tools_data if tool.get("name")]
-            # Handle dictionary type
-            elif isinstance(tools_data, dict) and "tools" in tools_data:
-                tool_names = [
-                    tool.get("name") for tool in tools_data["tools"] if tool.get("name")
-                ]
+            self._fetch_tools(server_name)
+            return self._tools_cache[server_name]
             
+        except Exception as e:
             if self.config.verbose:
-                msg = "Retrieved %i tools for server: %s" % (
-                    len(tool_names), server_name
-                )
-                ui.print_verbose(msg)
+                ui.print_verbose("Failed to list tools for server %s: %s", server_name, e)
             
+            # Fall back to config-based tools, cached like discovered tools so an
+            # unreachable server isn't retried until the cache is invalidated
+            tool_names = self._get_config_tools(server_name)
             self._tools_cache[server_name] = tool_names
             return tool_names
+    
+    def _fetch_tools(self, server_name: str) -> None:
+        """Fill a server's tools, descriptions and schema caches from one listing."""
+        tools = list(_iter_tools(self._list_tools(server_name)))
+        
+        if self.config.verbose:
+            ui.print_verbose("Retrieved %i tools for server: %s", len(tools), server_name)
+        
+        self._tools_cache[server_name] = [tool.name for tool in tools]
+        self._descriptions_cache[server_name] = {
+            tool.name: tool.description or f"{tool.name} tool" for tool in tools
+        }
+        for tool in tools:
+            self._schema_cache[f"{server_name}:{tool.name}"] = tool._asdict()
+    
+    def _list_tools(self, server_name: str) -> Any:
+        """List a server's tools, sharing one list_tools request between lookups."""
+        if server_name not in self._listings:
+            self._fetch_listings([server_name])
+        
+        tools_data = self._listings[server_name]
+        if isinstance(tools_data, BaseException):
+            raise tools_data
+        return tools_data
+    
+    def _fetch_listings(self, server_names: List[str]) -> None:
+        """List the tools of several servers concurrently and store the listings."""
+        self._store_listings(server_names, self._run_async(self._list_all(server_names)))
+    
+    async def _list_all(self, server_names: List[str]) -> List[Any]:
+        """List the tools of several servers concurrently, returning failures as-is."""
+        async def list_tools(server_name):
+            async def operation(session):
+                return await session.list_tools()
             
-        except Exception as e:
+            return await self._execute_with_session(server_name, operation)
+        
+        return await asyncio.gather(
+            *(list_tools(server_name) for server_name in server_names),
+            return_exceptions=True
+        )
+    
+    def _store_listings(self, server_names: List[str], listings: List[Any]) -> None:
+        """Store tools listings.
+        
+        Failures are stored as well, so lookups don't retry an unreachable server one
+        by one, and every listing is timed so it is refreshed after the TTL.
+        """
+        fetched_at = time.monotonic()
+        for server_name, tools_data in zip(server_names, listings):
+            self._listings[server_name] = tools_data
+            self._tools_fetched_at[server_name] = fetched_at
+        
+        if self._tools_file is not None:
+            self._persist_tools()
+    
+    def _server_fingerprint(self, server_name: str) -> str:
+        """Hash a server's configuration, to tell whether a persisted listing still applies."""
+        server_config = self.config.get_mcp_server(server_name)
+        return hashlib.sha256(server_config.model_dump_json().encode()).hexdigest()
+    
+    def _load_persisted_tools(self) -> None:
+        """Seed the tools listings with those persisted by earlier runs, if still fresh."""
+        try:
+            data = json_codec.loads(self._tools_file.read_bytes())
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict):
+            return
+        
+        now = time.time()
+        for server_name in self.config.list_mcp_servers():
+            # Malformed entries are skipped, so a damaged file never breaks startup
+            try:
+                entry = data[server_name]
+                if entry["fingerprint"] != self._server_fingerprint(server_name):
+                    continue
+                age = now - entry["fetched_at"]
+                tools = entry["tools"]
+            except (KeyError, TypeError):
+                continue
+            if not isinstance(tools, list) or not all(isinstance(tool, dict) for tool in tools):
+                continue
+            if 0 <= age <= self.config.mcp_tools_cache_ttl:
+                self._listings[server_name] = tools
+                self._tools_fetched_at[server_name] = time.monotonic() - age
+                if self.config.verbose:
+                    ui.print_verbose("Using persisted tools for server: %s", server_name)
+    
+    def _persist_tools(self) -> None:
+        """Write the successful tools listings to the tools file, atomically."""
+        now, monotonic_now = time.time(), time.monotonic()
+        data = {}
+        for server_name, tools_data in self._listings.items():
+            fetched_at = self._tools_fetched_at.get(server_name, float("-inf"))
+            # Failed listings and those marked stale, with no finite fetch time, are
+            # left out
+            if isinstance(tools_data, BaseException) or not math.isfinite(fetched_at):
+                continue
+            data[server_name] = {
+                "fingerprint": self._server_fingerprint(server_name),
+                "fetched_at": now - (monotonic_now - fetched_at),
+                "tools": [tool._asdict() for tool in _iter_tools(tools_data)],
+            }
+        
+        try:
+            self._tools_file.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                "wb", dir=self._tools_file.parent, delete=False
+            ) as tmp:
+                tmp.write(json_codec.dumps_bytes(data))
+            os.replace(tmp.name, self._tools_file)
+        except (OSError, TypeError, ValueError) as e:
             if self.config.verbose:
-                msg = "Failed to list tools for server %s: %s" % (
-                    server_name, str(e)
-                )
-                ui.print_verbose(msg)
-            
-            # Fall back to config-based tools
-            return self._get_config_tools(server_name)
+                ui.print_verbose("Failed to persist MCP tools: %s", e)
+    
+    def _missing_listings(self, server_names: List[str]) -> List[str]:
+        """Get the servers without a current tools listing."""
+        for server_name in server_names:
+            self._expire_tools_cache(server_name)
+        return [server_name for server_name in server_names if server_name not in self._listings]
+    
+    def _prefetch_listings(self, server_names: List[str]) -> None:
+        """Fetch the listings of the servers that have none cached, concurrently."""
+        missing = self._missing_listings(server_names)
+        if missing:
+            self._fetch_listings(missing)
+    
+    async def _aprefetch_listings(self, server_names: List[str]) -> None:
+        """Fetch missing listings from a coroutine without blocking its event loop."""
+        missing = self._missing_listings(server_names)
+        if missing:
+            self._store_listings(missing, await self._arun(self._list_all(missing)))
+    
+    def list_all_tools(self, server_names: List[str]) -> Dict[str, List[str]]:
+        """List available tools for several MCP servers, querying them concurrently."""
+        self._prefetch_listings(server_names)
+        return {server_name: self.list_available_tools(server_name) for server_name in server_names}
+    
+    def get_all_tool_descriptions(self, server_names: List[str]) -> Dict[str, Dict[str, str]]:
+        """Get tool descriptions for several MCP servers, querying them concurrently."""
+        self._prefetch_listings(server_names)
+        return {
+            server_name: self.get_tool_descriptions(server_name) for server_name in server_names
+        }
+    
+    async def alist_all_tools(self, server_names: List[str]) -> Dict[str, List[str]]:
+        """List available tools for several MCP servers from a coroutine."""
+        await self._aprefetch_listings(server_names)
+        return {server_name: self.list_available_tools(server_name) for server_name in server_names}
+    
+    async def aget_all_tool_descriptions(
+        self, server_names: List[str]
+    ) -> Dict[str, Dict[str, str]]:
+        """Get tool descriptions for several MCP servers from a coroutine."""
+        await self._aprefetch_listings(server_names)
+        return {
+            server_name: self.get_tool_descriptions(server_name) for server_name in server_names
+        }
+    
+    def _expire_tools_cache(self, server_name: str) -> None:
+        """Invalidate a server's cached tools once they are older than the TTL."""
+        fetched_at = self._tools_fetched_at.get(server_name)
+        if fetched_at is None:
+            return
+        if time.monotonic() - fetched_at > self.config.mcp_tools_cache_ttl:
+            self.invalidate_tools_cache(server_name)
     
     def _get_config_tools(self, server_name: str) -> List[str]:
         """Get tools from config for a specific MCP server."""
         config_tools = self.config.get_mcp_server_tools(server_name)
         if config_tools:
             if self.config.verbose:
-                msg = "Using %i tools from config for server: %s" % (
-                    len(config_tools), server_name
+                ui.print_verbose(
+                    "Using %i tools from config for server: %s", len(config_tools), server_name
                 )
-                ui.print_verbose(msg)
             return config_tools
         
         # No default tools - rely on discovery
         if self.config.verbose:
-            ui.print_verbose(f"No tools found in config for server: {server_name}")
+            ui.print_verbose("No tools found in config for server: %s", server_name)
         return []
     
     def get_tool_schema(
         self, server_name: str, tool_name: str
     ) -> Optional[Dict[str, Any]]:
         """Get the schema for a specific MCP tool."""
+        self._expire_tools_cache(server_name)
         cache_key = f"{server_name}:{tool_name}"
         if cache_key in self._schema_cache:
             return self._schema_cache[cache_key]
         
         try:
-            # Define the async operation
-            async def operation(session):
-                tools_data = await session.list_tools()
-                
-                # Handle ListToolsResult type (from MCP SDK)
-                if hasattr(tools_data, "tools") and isinstance(tools_data.tools, list):
-                    for tool in tools_data.tools:
-                        if hasattr(tool, "name") and tool.name == tool_name:
-                            # Convert tool object to dictionary
-                            return {
-                                "name": tool.name,
-                                "description": (
-                                    tool.description if hasattr(tool, "description") else ""
-                                ),
-                                "parameters": (
-                                    tool.parameters if hasattr(tool, "parameters") else {}
-                                )
-                            }
-                
-                # Handle other types as before
-                if isinstance(tools_data, tuple) and len(tools_data) > 0:
-                    tools = tools_data[0]
-                else:
-                    tools = tools_data
-                
-                if isinstance(tools, dict) and "tools" in tools:
-                    tools = tools["tools"]
-                
-                if isinstance(tools, list):
-                    for tool in tools:
-                        if tool.get("name") == tool_name:
-                            return tool
-                
-                return None
-            
-            # Run the async operation in a new event loop
-            tool = self._run_async(self._execute_with_session(server_name, operation))
+            # Schemas of all the server's tools are cached along with its descriptions
+            if server_name not in self._descriptions_cache:
+                self._fetch_tools(server_name)
             
+            tool = self._schema_cache.get(cache_key)
             if tool:
                 if self.config.verbose:
-                    ui.print_verbose("Retrieved schema for tool: %s" % tool_name)
-                self._schema_cache[cache_key] = tool
+                    ui.print_verbose("Retrieved schema for tool: %s", tool_name)
                 return tool
             
             if self.config.verbose:
-                ui.print_verbose("Tool %s not found" % tool_name)
+                ui.print_verbose("Tool %s not found", tool_name)
             return None
             
         except Exception as e:
             if self.config.verbose:
-                ui.print_verbose(
-                    "Failed to get schema for tool %s: %s" % (tool_name, str(e))
-                )
+                ui.print_verbose("Failed to get schema for tool %s: %s", tool_name, e)
             return None
     
     def get_tool_descriptions(self, server_name: str) -> Dict[str, str]:
         """Get descriptions for all tools on a specific MCP server."""
+        self._expire_tools_cache(server_name)
         if server_name in self._descriptions_cache:
             return self._descriptions_cache[server_name]
         
         try:
-            # Define the async operation
-            async def operation(session):
-                return await session.list_tools()
-            
-            # Run the async operation in a new event loop
-            tools_data = self._run_async(self._execute_with_session(server_name, operation))
-            
-            # Extract tool descriptions, handling different data structures
-            descriptions = {}
-            
-            # Handle ListToolsResult type (from MCP SDK)
-            if hasattr(tools_data, "tools") and isinstance(tools_data.tools, list):
-                for tool in tools_data.tools:
-                    if hasattr(tool, "name"):
-                        name = tool.name
-                        description = (
-                            tool.description if hasattr(tool, "description") else f"{name} tool"
-                        )
-                        descriptions[name] = description
-            # Handle other types as before
-            else:
-                tools_list = []
-                
-                if isinstance(tools_data, list):
-                    tools_list = tools_data
-                elif isinstance(tools_data, dict) and "tools" in tools_data:
-                    tools_list = tools_data["tools"]
-                elif isinstance(tools_data, tuple) and len(tools_data) > 0:
-                    first_item = tools_data[0]
-                    if isinstance(first_item, list):
-                        tools_list = first_item
-                    elif hasattr(first_item, "tools"):
-                        tools_list = first_item.tools
-                
-                for tool in tools_list:
-                    if isinstance(tool, dict):
-                        name = tool.get("name")
-                        description = tool.get("description") or f"{name} tool"
-                        if name:
-                            descriptions[name] = description
-                    elif hasattr(tool, "name"):
-                        name = tool.name
-                        description = (
-                            tool.description if hasattr(tool, "description") else f"{name} tool"
-                        )
-                        descriptions[name] = description
-            
-            if self.config.verbose:
-                msg = "Retrieved descriptions for %i tools on server: %s" % (
-                    len(descriptions), server_name
-                )
-                ui.print_verbose(msg)
-            
-            self._descriptions_cache[server_name] = descriptions
-            return descriptions
+            self._fetch_tools(server_name)
+            return self._descriptions_cache[server_name]
             
         except Exception as e:
             if self.config.verbose:
-                msg = "Failed to get tool descriptions for server %s: %s" % (
-                    server_name, str(e)
+                ui.print_verbose(
+                    "Failed to get tool descriptions for server %s: %s", server_name, e
                 )
-                ui.print_verbose(msg)
+            self._descriptions_cache[server_name] = {}
             return {}
     
+    def invalidate_tools_cache(self, server_name: Optional[str] = None) -> None:
+        """Drop cached tools, descriptions, schemas and results for a server, or all.
+        
+        Call this when a server's tools may have changed, e.g. after it restarts.
+        """
+        if server_name is None:
+            self._tools_cache.clear()
+            self._listings.clear()
+            self._tools_fetched_at.clear()
+            self._descriptions_cache.clear()
+            self._schema_cache.clear()
+            with self._result_lock:
+                self._result_cache.clear()
+        else:
+            self._tools_cache.pop(server_name, None)
+            self._listings.pop(server_name, None)
+            self._tools_fetched_at.pop(server_name, None)
+            self._descriptions_cache.pop(server_name, None)
+            with self._result_lock:
+                for cache_key in [key for key in self._result_cache if key[0] == server_name]:
+                    del self._result_cache[cache_key]
+            prefix = f"{server_name}:"
+            for cache_key in [key for key in self._schema_cache if key.startswith(prefix)]:
+                del self._schema_cache[cache_key]
+        
+        if self.config.verbose:
+            ui.print_verbose("Invalidated tools cache for server: %s", server_name or 'all')
+        
+        for listener in self._tools_listeners:
+            listener()
+    
+    def add_tools_listener(self, listener: Callable[[], None]) -> None:
+        """Register a callback to be notified when cached tools are invalidated.
+        
+        Listeners are also called from the MCP loop thread when a server reports that
+        its tools changed, so they must only do thread-safe work, like dropping a
+        memoized value.
+        """
+        self._tools_listeners.append(listener)
+    
     def format_tool_arguments(self, args_str: str) -> List[str]:
         """Format tool arguments from a string to a list, handling quotes properly."""
         if not args_str:
             return []
         
-        # Use shlex to properly handle quoted arguments
-        return shlex.split(args_str)
+        # Copy the cached split so callers may modify the list
+        return list(_split_arguments(args_str))
     
     def close(self):
         """Close all resources."""
-        self._executor.shutdown(wait=False)
-
-    def _start_server_process(self, server_name: str) -> subprocess.Popen:
-        """Start an MCP server process."""
-        server_config = self.config.get_mcp_server(server_name)
-        if not server_config:
-            raise ValueError("MCP server '%s' not found in configuration" % server_name)
-        
-        if server_name in self.processes and self.processes[server_name].poll() is None:
-            # Process is still running
-            return self.processes[server_name]
-        
-        # Create environment with server config
-        env = os.environ.copy()
-        if server_config.env:
-            env.update(server_config.env)
-        
-        command = [server_config.command] + server_config.args
-        
-        if self.config.verbose:
-            ui.print_verbose("Starting MCP server: %s" % server_name)
-            ui.print_verbose("Command: %s" % ' '.join(command))
-            env_vars = ', '.join("%s=%s..." % (k, v[:3]) for k, v in server_config.env.items())
-            ui.print_verbose("Environment variables: %s" % env_vars)
-        
-        # Start the process
-        process = subprocess.Popen(
-            command,
-            env=env,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            stdin=subprocess.PIPE,
-            text=True,
-            bufsize=1  # Line buffered
-        )
-        
-        # Store the process
-        self.processes[server_name] = process
-        
-        # Give the server a moment to start up
-        time.sleep(0.5)
-        
-        return process
+        if self._loop.is_running():
+            try:
+                self._run_async(self._close_sessions())
+            finally:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._loop_thread.join()
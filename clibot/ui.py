@@ -1,6 +1,6 @@
 """UI components for CliBot."""
 
-import json
+import logging
 import os
 import sys
 from typing import Any, List
@@ -9,19 +9,65 @@ from prompt_toolkit import PromptSession
 from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
 from prompt_toolkit.completion import WordCompleter
 from prompt_toolkit.formatted_text import HTML
-from prompt_toolkit.history import FileHistory
+from prompt_toolkit.history import FileHistory, ThreadedHistory
 from rich.console import Console
+from rich.highlighter import JSONHighlighter
 from rich.markdown import Markdown
 from rich.panel import Panel
 from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich.text import Text
 
+from . import json_codec
+
 # Create console for output
 console = Console()
 
+# MCP results with more JSON than this are printed without syntax highlighting, which
+# would otherwise dominate the time to print them
+_MAX_HIGHLIGHTED_JSON_CHARS = 1024 * 1024
+_json_highlighter = JSONHighlighter()
+
 # Create a separate console for verbose output
 verbose_console = Console(stderr=True, style="dim")
 
+class _VerboseHandler(logging.Handler):
+    """Logging handler that writes records to the verbose console."""
+    
+    def emit(self, record: logging.LogRecord):
+        try:
+            verbose_console.print(f"[cyan]{record.getMessage()}")
+        except Exception:
+            self.handleError(record)
+
+# Logger for verbose output. Messages take lazy %-style arguments, so they are only
+# formatted when the record is actually emitted.
+logger = logging.getLogger("clibot")
+logger.addHandler(_VerboseHandler())
+logger.setLevel(logging.DEBUG)
+logger.propagate = False
+
+# History files larger than this are trimmed at startup to their newest lines, since
+# history search scans the whole history
+_MAX_HISTORY_BYTES = 2 * 1024 * 1024
+_KEEP_HISTORY_LINES = 10000
+
+def _trim_history(path: str) -> None:
+    """Keep only the newest entries of a history file that grew too large."""
+    try:
+        if os.path.getsize(path) <= _MAX_HISTORY_BYTES:
+            return
+        with open(path, "rb") as f:
+            lines = f.readlines()
+    except OSError:
+        return
+    
+    # Start at an entry boundary; each entry begins with a "# <timestamp>" line
+    start = max(len(lines) - _KEEP_HISTORY_LINES, 0)
+    while start < len(lines) and not lines[start].startswith(b"#"):
+        start += 1
+    with open(path, "wb") as f:
+        f.writelines(lines[start:])
+
 # Initialize prompt_toolkit session
 try:
     # Use a more reliable path for the history file within the user's config directory
@@ -29,6 +75,7 @@ try:
     # Create config directory if it doesn't exist
     os.makedirs(CONFIG_DIR, exist_ok=True)
     HISTORY_FILE = os.path.join(CONFIG_DIR, "history")
+    _trim_history(HISTORY_FILE)
     
     # Common commands for tab completion
     command_completer = WordCompleter([
@@ -37,9 +84,10 @@ try:
         "git", "jira", "jenkins", "confluence"
     ])
     
-    # Create prompt session with history
+    # Create prompt session with history, loaded in a background thread so reading
+    # the file doesn't delay the prompt
     prompt_session = PromptSession(
-        history=FileHistory(HISTORY_FILE),
+        history=ThreadedHistory(FileHistory(HISTORY_FILE)),
         auto_suggest=AutoSuggestFromHistory(),
         enable_history_search=True,
         completer=command_completer
@@ -72,9 +120,24 @@ def print_error(message: str):
     """Print an error message."""
     console.print(Panel(Text(message, style="bold red"), title="Error", border_style="red"))
 
-def print_verbose(message: str):
-    """Print a verbose message if verbose mode is enabled."""
-    verbose_console.print(f"[cyan]{message}")
+def print_stream(delta: str):
+    """Print a chunk of a streamed AI response without a trailing newline."""
+    console.print(delta, end="", markup=False, highlight=False)
+
+def end_stream():
+    """Finish a streamed AI response."""
+    console.print()
+
+def set_verbose(enabled: bool):
+    """Enable or disable verbose output."""
+    logger.setLevel(logging.DEBUG if enabled else logging.INFO)
+
+def print_verbose(message: str, *args: Any):
+    """Print a verbose message if verbose mode is enabled.
+    
+    Optional %-style arguments are only formatted when the message is printed.
+    """
+    logger.debug(message, *args)
 
 def print_mcp_servers(servers: List[str]):
     """Print available MCP servers."""
@@ -94,11 +157,18 @@ def print_mcp_result(result: Any):
     """Print the result of an MCP command."""
     console.print("\n[bold blue]MCP Command Result:[/bold blue]")
     if isinstance(result, dict) or isinstance(result, list):
-        console.print_json(json.dumps(result, indent=2))
+        # Encode once and print the text directly, rather than through print_json,
+        # which encodes with the slower stdlib json
+        text = json_codec.dumps(result, default=str, indent=True)
+        if len(text) > _MAX_HIGHLIGHTED_JSON_CHARS:
+            console.out(text, highlight=False)
+        else:
+            console.print(_json_highlighter(text), soft_wrap=True)
     else:
         console.print(result)
     console.print()
 
+
 def get_user_input() -> str:
     """Get input from the user with history navigation and line editing."""
     try: